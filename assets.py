@@ -0,0 +1,103 @@
+import base64
+import functools
+import hashlib
+import io
+import os
+
+import streamlit as st
+from PIL import Image
+
+STATIC_DIR = "static"
+# URL tempat Streamlit menyajikan folder static/ (server.enableStaticServing)
+STATIC_URL = "app/static"
+VARIANT_DIR = os.path.join(STATIC_DIR, "images", "_variants")
+JPEG_QUALITY = 82
+
+MIME_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".gif": "image/gif"}
+
+
+class Asset:
+    """Bytes of a static file (or of a resized variant) plus their content hash."""
+
+    def __init__(self, path, data, mime):
+        self.path = path
+        self.data = data
+        self.mime = mime
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        self._data_uri = None
+
+    @property
+    def version(self):
+        return self.sha256[:12]
+
+    @property
+    def data_uri(self):
+        if self._data_uri is None:
+            self._data_uri = f"data:{self.mime};base64,{base64.b64encode(self.data).decode()}"
+        return self._data_uri
+
+
+def _resize(data, mime, max_width, quality):
+    image = Image.open(io.BytesIO(data))
+    if max_width and image.width > max_width:
+        height = round(image.height * max_width / image.width)
+        image = image.resize((max_width, height), Image.LANCZOS)
+    out = io.BytesIO()
+    image.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    # Pakai hasil kompresi hanya jika memang lebih kecil
+    if out.tell() < len(data):
+        return out.getvalue(), "image/jpeg"
+    return data, mime
+
+
+@functools.lru_cache(maxsize=64)
+def _load(path, mtime_ns, max_width, quality):
+    with open(path, "rb") as f:
+        data = f.read()
+    mime = MIME_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+    if max_width or quality:
+        data, mime = _resize(data, mime, max_width, quality or JPEG_QUALITY)
+    return Asset(path, data, mime)
+
+
+def load_asset(path, max_width=None, quality=None):
+    """Encode a static file once per process; re-read only when its mtime changes."""
+    return _load(path, os.stat(path).st_mtime_ns, max_width, quality)
+
+
+def static_url(path, max_width=None, quality=None):
+    """Browser-cacheable URL for ``path`` (or its resized variant) under Streamlit's static serving."""
+    asset = load_asset(path, max_width, quality)
+    if max_width or quality:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        ext = ".jpg" if asset.mime == "image/jpeg" else os.path.splitext(path)[1]
+        variant = os.path.join(VARIANT_DIR, f"{stem}-{asset.version}{ext}")
+        if not os.path.exists(variant):
+            os.makedirs(VARIANT_DIR, exist_ok=True)
+            with open(variant + ".tmp", "wb") as f:
+                f.write(asset.data)
+            os.replace(variant + ".tmp", variant)
+        path = variant
+    rel = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+    return f"{STATIC_URL}/{rel}?v={asset.version}"
+
+
+@functools.lru_cache(maxsize=16)
+def _background_css(url):
+    return f"""
+        <style>
+        .stApp {{
+            background-image: url("{url}");
+            background-size: cover;
+            background-position: center;
+        }}
+        </style>
+        """
+
+
+def background_css(image_file):
+    # Dengan static serving CSS hanya berisi URL (~200 byte) yang di-cache
+    # browser; tanpa itu, fallback ke data URI yang di-encode sekali per proses
+    if st.get_option("server.enableStaticServing"):
+        return _background_css(static_url(image_file))
+    return _background_css(load_asset(image_file).data_uri)
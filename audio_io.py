@@ -0,0 +1,103 @@
+import io
+import os
+import tempfile
+import threading
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+# Tingkat kualitas soxr, dari paling teliti ke paling cepat; "HQ" sama dengan librosa.load
+QUALITIES = ("VHQ", "HQ", "MQ", "LQ", "QQ")
+# Jumlah byte yang terpaksa ditulis ke disk (fallback file sementara)
+_stats = {"requests": 0, "fallbacks": 0, "disk_bytes_written": 0, "last_disk_bytes": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(disk_bytes=0):
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["last_disk_bytes"] = disk_bytes
+        _stats["disk_bytes_written"] += disk_bytes
+        if disk_bytes:
+            _stats["fallbacks"] += 1
+
+
+def stats():
+    with _stats_lock:
+        out = dict(_stats)
+    out["disk_bytes_per_request"] = out["disk_bytes_written"] / out["requests"] if out["requests"] else 0.0
+    return out
+
+
+def resample(audio, orig_sr, target_sr, quality="HQ"):
+    """Resample with soxr; a no-op when the rates already match.
+
+    ``quality="HQ"`` is what ``librosa.load`` uses by default
+    (``res_type="soxr_hq"``); "MQ"/"LQ" trade some filter quality for
+    speed. Paths are loaded with the same setting, so a file gives the same
+    samples whether it arrives as a path or as bytes.
+    """
+    if target_sr is None or orig_sr == target_sr:
+        return audio
+    return soxr.resample(audio, orig_sr, target_sr, quality=quality).astype(audio.dtype, copy=False)
+
+
+def guess_suffix(data):
+    if data[:4] == b"RIFF":
+        return ".wav"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return ".mp3"
+    if data[:4] == b"fLaC":
+        return ".flac"
+    if data[:4] == b"OggS":
+        return ".ogg"
+    return ".wav"
+
+
+def _decode_native(data, suffix):
+    try:
+        audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=False)
+        _count()
+        return audio.T, sr
+    except sf.LibsndfileError:
+        pass
+    # libsndfile tidak bisa membaca formatnya (mis. MP3 di libsndfile lama):
+    # tulis ke file sementara untuk audioread, lalu hapus
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        _count(len(data))
+        return librosa.load(path, sr=None, mono=False)
+    finally:
+        os.remove(path)
+
+
+def decode_audio(data, sr=22050, suffix=None, quality="HQ"):
+    """Decode encoded audio bytes in memory to mono float32 at ``sr``."""
+    if hasattr(data, "read"):
+        data = data.read()
+    data = bytes(data)
+    audio, native_sr = _decode_native(data, suffix or guess_suffix(data))
+    audio = librosa.to_mono(audio)
+    return resample(audio, native_sr, sr, quality), sr if sr is not None else native_sr
+
+
+def load_audio(source, sr=22050, quality="HQ"):
+    """Load a path, encoded bytes, a file-like object, an ``(array, rate)`` pair or a raw array.
+
+    A bare array is taken to be mono samples already at ``sr``.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return librosa.load(source, sr=sr, res_type=f"soxr_{quality.lower()}")
+    if isinstance(source, tuple):
+        audio, native_sr = source
+        audio = librosa.to_mono(np.asarray(audio, dtype=np.float32))
+        _count()
+        return resample(audio, native_sr, sr, quality), sr if sr is not None else native_sr
+    if isinstance(source, np.ndarray):
+        _count()
+        return librosa.to_mono(source.astype(np.float32, copy=False)), sr
+    return decode_audio(source, sr=sr, quality=quality)
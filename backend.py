@@ -1,67 +1,28 @@
+import logging
 import os
 import time
-import base64
 import joblib
 import librosa
-import tempfile
 import numpy as np
 import streamlit as st
 import sounddevice as sd
-from collections import Counter
 from scipy.io.wavfile import write, read
+# Harus diimpor di sini: knn_model.joblib di-pickle dari notebook sebagai
+# __main__.KNearestNeighbors, dan backend.py adalah __main__ saat streamlit run
+from knn import KNearestNeighbors, euclidean_distance
+from feature_cache import get_cache
+from inference import analyze_clip
+from service import SERVICE_URL_ENV, predict_remote
+from assets import background_css, load_asset
+from metrics import configure_from_env, metrics
+from emobot import emobot_response, get_index
 
 SAMPLE_RATE = 44100
 DURATION = 3
+PHOTO_WIDTH = 480
 
+logger = logging.getLogger(__name__)
 
-def euclidean_distance(x1, x2):
-    return np.sqrt(np.sum((x1 - x2) ** 2))
-
-class KNearestNeighbors:
-    def __init__(self, k=3):
-        self.k = k
-
-    def fit(self, X, y):
-        self.X_train = X
-        self.y_train = y
-
-    def predict(self, X):
-        predictions = [self._predict(x) for x in X]
-        return np.array(predictions)
-
-    def _predict(self, x):
-        # Hitung jarak ke semua data latih
-        distances = [euclidean_distance(x, x_train) for x_train in self.X_train]
-        # Ambil indeks dari k tetangga terdekat
-        k_indices = np.argsort(distances)[:self.k]
-        # Ambil label dari k tetangga terdekat
-        k_nearest_labels = [self.y_train[i] for i in k_indices]
-        # Voting mayoritas
-        most_common = Counter(k_nearest_labels).most_common(1)
-        return most_common[0][0]
-
-def extract_features(file_path):
-    audio, src = librosa.load(file_path)
-
-    # MFCC
-    mfccs = librosa.feature.mfcc(y=audio, sr=src, n_mfcc=13)
-    mfccs = np.mean(mfccs.T, axis=0)
-
-    # Chroma
-    chroma = librosa.feature.chroma_stft(y=audio, sr=src)
-    mean_chroma = np.mean(chroma, axis=1)
-
-    # Delta
-    mfccs_delta = librosa.feature.delta(librosa.feature.mfcc(y=audio, sr=src, n_mfcc=13))
-    mfccs_delta = np.mean(mfccs_delta.T, axis=0)
-
-    # Delta2
-    mfccs_delta2 = librosa.feature.delta(librosa.feature.mfcc(y=audio, sr=src, n_mfcc=13), order=2)
-    mfccs_delta2 = np.mean(mfccs_delta2.T, axis=0)
-
-    # Gabungkan semua fitur
-    features = np.concatenate([mfccs, mfccs_delta, mfccs_delta2])
-    return features
 
 def normalize_audio(audio):
     max_amplitude = np.max(np.abs(audio))
@@ -71,20 +32,7 @@ def normalize_audio(audio):
     return (normalized_audio * 32767).astype(np.int16)
 
 def add_background(image_file):
-    with open(image_file, "rb") as image:
-        encoded_string = base64.b64encode(image.read()).decode()
-    st.markdown(
-        f"""
-        <style>
-        .stApp {{
-            background-image: url("data:image/png;base64,{encoded_string}");
-            background-size: cover;
-            background-position: center;
-        }}
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+    st.markdown(background_css(image_file), unsafe_allow_html=True)
 
 def remove_info():
   time.sleep(5)
@@ -105,7 +53,7 @@ def emotion_detection():
 
 
     if st.session_state.audio_file is not None:
-        st.audio(st.session_state.audio_file, format="audio/wav")
+        st.audio(st.session_state.audio_file, format=st.session_state.audio_format)
         st.success("Audio Berhasil Direkam")
 
         if st.button("Muat Ulang"):
@@ -115,35 +63,38 @@ def emotion_detection():
     if st.session_state.audio_file is None:
         sound_file = st.file_uploader("Unggah File Suara (WAV, MP3)", type=["wav", "mp3"])
         if sound_file is not None:
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-            st.session_state.audio_file = temp_file.name
-            temp_file.write(sound_file.read())
+            # Simpan isi file di memori; tidak perlu file sementara di /tmp
+            with metrics.stage("upload"):
+                st.session_state.audio_file = sound_file.getvalue()
+            st.session_state.audio_format = sound_file.type or "audio/wav"
             st.success("File audio berhasil diunggah.")
 
     if st.session_state.audio_file and st.button("Submit Audio"):
         try:
-            # Extract features
-            features = extract_features(st.session_state.audio_file)
-            
-            # Load model and scaler
-            knn = joblib.load('model/knn_model.joblib')
-            scaler = joblib.load('model/scaler.joblib')
-            
-            # Scale features
-            features_scaled = scaler.transform([features])
-            
-            # Predict emotion
-            predicted_emotion = knn.predict(features_scaled)
-            predik = predicted_emotion[0]
-
-            emosi = [ 'angry', 'sad', 'fear', 'disgust']
-            
-            st.info(f"Emosi yang terdeteksi: {predicted_emotion[0]}")
-            if predik in emosi : 
+            with metrics.request("submit"):
+                if os.environ.get(SERVICE_URL_ENV):
+                    # Inferensi lewat service HTTP terpisah (aturan keputusan yang sama)
+                    with metrics.stage("remote_predict"):
+                        hasil = predict_remote(st.session_state.audio_file)
+                else:
+                    # Klasifikasi per jendela (satu spektrogram, satu panggilan KNN)
+                    # lalu diagregasi menjadi skor depresi tingkat klip
+                    hasil = analyze_clip(st.session_state.audio_file, cache=get_cache())
+            predik = hasil["emotion"]
+            depresi = hasil["depression"]
+
+            st.info(f"Emosi yang terdeteksi: {predik}")
+            if depresi : 
                 st.error("Kondisi Mental : Depresi ")
             else : 
                 st.success("Kondisi Mental : Normal ")
+            st.caption(f"Skor depresi: {hasil['depression_score']:.2f} · "
+                       f"Keyakinan: {hasil['confidence']:.0%} · "
+                       f"{hasil['n_windows']} jendela analisis")
         except Exception as e:
+            # Jenis error dicatat di metrik (request_errors_total) dan traceback-nya
+            # di log server; pengguna hanya melihat pesan singkat
+            logger.exception("Gagal memproses audio")
             st.error(f"Terjadi kesalahan dalam memproses audio: {str(e)}")
 
 def article_page():
@@ -314,48 +265,6 @@ def emobot_page():
         else:
             st.markdown(f"**EmoBot:** {chat['message']}")
 
-def emobot_response(user_input):
-    responses = {
-        "hello": "Hii, apakah ada yang bisa dibantu ?",
-        "how are you": "I'm just a bot, but I'm here to help!",
-        "emotion detection": "I can help detect emotions from your voice! Try it out in the main menu.",
-        "assalamu'alaikum" : "Wa'alaikumsalaam.",
-        "unesa": "Satu Langkah Di Depan",
-        "halo": "Halo! Ada yang bisa saya bantu hari ini?",
-        "apa kabar": "Saya hanyalah bot, tapi saya merasa sangat senang bisa membantu Anda!",
-        "deteksi emosi": "Saya dapat membantu mendeteksi emosi dari suara Anda! Silakan coba fitur ini di menu utama.",
-        "bagaimana cara menggunakan": "Anda dapat menggunakan fitur dengan memilih menu yang tersedia di sidebar.",
-        "tentang emovoice": "EmoVoice adalah sistem deteksi emosi berbasis suara. Kami menggunakan teknologi canggih untuk mendeteksi berbagai emosi manusia.",
-        "terima kasih": "Sama-sama! Saya senang bisa membantu Anda.",
-        "siapa yang membuat emovoice": "EmoVoice dibuat oleh tim mahasiswa yang antusias terhadap kecerdasan buatan dan pengolahan suara.",
-        "apa fungsi utama emovoice": "Fungsi utama EmoVoice adalah mendeteksi emosi seperti Bahagia, Sedih, Marah, Takut, Terkejut, Jijik, dan Netral dari suara.",
-        "emobot apa kabar": "Saya baik-baik saja! Bagaimana dengan Anda?",
-        "bisa bantu saya": "Tentu saja! Silakan tanyakan apa saja.",
-        "fitur apa saja di emovoice": "Kami memiliki fitur Deteksi Emosi, Artikel terkait, dan juga interaksi dengan EmoBot seperti ini.",
-        "bagaimana cara kerja deteksi emosi": "Kami menggunakan algoritma KNN dan fitur suara seperti MFCC, Chroma, dan Delta untuk mendeteksi emosi dari suara Anda.",
-        "kenapa saya harus mencoba ini": "Karena ini adalah cara menarik untuk memahami emosi Anda dan bagaimana teknologi dapat membantu menganalisisnya!",
-        "selamat tinggal": "Selamat tinggal! Semoga harimu menyenangkan.",
-        "apa itu knn": "KNN atau K-Nearest Neighbors adalah algoritma pembelajaran mesin yang digunakan untuk mengklasifikasikan data berdasarkan tetangga terdekat.",
-        "mfcc itu apa": "MFCC atau Mel-frequency cepstral coefficients adalah fitur audio yang sering digunakan untuk analisis suara, seperti deteksi emosi.",
-        "chroma itu apa": "Fitur Chroma merepresentasikan energi frekuensi dalam nada musik tertentu dan digunakan dalam pengolahan audio.",
-        "bisa ngobrol dengan saya?": "Tentu saja! Saya di sini untuk membantu Anda kapan saja.",
-        "siapa yang menggunakan emovoice": "EmoVoice dapat digunakan oleh siapa saja, termasuk profesional kesehatan mental, layanan pelanggan, atau hanya untuk hiburan.",
-        "aplikasi ini gratis?": "Ya, Anda bisa menggunakan EmoVoice secara gratis untuk eksplorasi dan penelitian.",
-        "apa yang bisa emobot lakukan": "Saya bisa menjawab pertanyaan Anda tentang EmoVoice, memberikan informasi, dan membantu memahami fitur deteksi emosi.",
-        "bagaimana cara mendeteksi emosi": "Silakan unggah atau rekam suara Anda di fitur Deteksi Emosi. EmoVoice akan menganalisis suara tersebut untuk mengidentifikasi emosi.",
-        "apa kegunaan deteksi emosi": "Deteksi emosi dapat digunakan untuk meningkatkan interaksi manusia-mesin, mendukung kesehatan mental, dan analisis perilaku pengguna.",
-        "mengapa emovoice penting": "Karena EmoVoice membantu menjembatani pemahaman antara emosi manusia dan teknologi, membuka peluang baru dalam berbagai aplikasi.",
-        "apakah emovoice menggunakan ai": "Ya, EmoVoice menggunakan kecerdasan buatan dan pembelajaran mesin untuk mendeteksi emosi dengan akurat.",
-        "di mana emovoice dikembangkan": "EmoVoice dikembangkan oleh mahasiswa yang tertarik dengan pengolahan sinyal suara di Indonesia.",
-        "berapa lama deteksi emosi dilakukan": "Proses deteksi emosi biasanya hanya membutuhkan beberapa detik setelah suara diunggah.",
-        "apakah hasil deteksi akurat": "Kami menggunakan algoritma yang dioptimalkan untuk akurasi tinggi, namun hasilnya tetap bergantung pada kualitas suara yang diberikan.",
-        "apa itu emosi": "Emosi adalah respons psikologis dan fisiologis yang membantu manusia memahami dan berinteraksi dengan dunia sekitar mereka.",
-        "bisakah membantu saya memahami algoritma?": "Tentu saja, saya bisa menjelaskan algoritma yang digunakan dalam EmoVoice, seperti KNN dan metode ekstraksi fitur audio.",
-        "berapa banyak emosi yang bisa dideteksi?": "EmoVoice mendeteksi 7 emosi dasar: Bahagia, Sedih, Marah, Takut, Jijik, Terkejut, dan Netral."
-    }
-    return responses.get(user_input.lower(), "Sorry Gw Gapaham, Bisa Di Ulangi ?")
-
-
 def about_page():
     st.title("About Us")
     add_background("static/images/bluebg.jpg")
@@ -383,13 +292,13 @@ def about_page():
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.image("static/images/rifat.jpeg", caption="Muhammad Rifat Syarief ( 23031554053 ) rifat@mhs.unesa.ac.id")
+        st.image(load_asset("static/images/rifat.jpeg", max_width=PHOTO_WIDTH).data, caption="Muhammad Rifat Syarief ( 23031554053 ) rifat@mhs.unesa.ac.id")
 
     with col2:
-        st.image("static/images/faiz.jpg", caption="Moch Faiz Febriawan ( 23031554068 )  mochfaiz.23068@mhs.unesa.ac.id")
+        st.image(load_asset("static/images/faiz.jpg", max_width=PHOTO_WIDTH).data, caption="Moch Faiz Febriawan ( 23031554068 )  mochfaiz.23068@mhs.unesa.ac.id")
 
     with col3:
-        st.image("static/images/serigala.jpg", caption="Alamsyah Ramadhan Vaganza ( 23031554192 ) amalsyah@mhs.unesa.ac.id")
+        st.image(load_asset("static/images/serigala.jpg", max_width=PHOTO_WIDTH).data, caption="Alamsyah Ramadhan Vaganza ( 23031554192 ) amalsyah@mhs.unesa.ac.id")
 
     st.markdown("---")
     st.subheader("EmoVoice 2024")
@@ -410,11 +319,15 @@ pages = {
 
 def main():
     st.set_page_config(page_title="Audio Recorder", page_icon="🎙️", layout="wide")
+    configure_from_env()
+    get_index()  # indeks intent EmoBot dibangun sekali per proses
 
     if 'page' not in st.session_state:
         st.session_state.page = 'first'
     if 'audio_file' not in st.session_state:
         st.session_state.audio_file = None
+    if 'audio_format' not in st.session_state:
+        st.session_state.audio_format = "audio/wav"
     if 'current_page' not in st.session_state:
         st.session_state.current_page = None
 
@@ -0,0 +1,193 @@
+"""Classify every audio file under a directory tree without the Streamlit UI.
+
+    python batch_infer.py "data/TESS Toronto emotional speech set data" -o results.csv -j 4
+
+Clips are decoded and split into analysis windows in a process pool. The
+windows of a batch of clips are classified together and every clip is
+scored with the same rule as the app (``inference.analyze_many``), so
+each row carries the emotion, the depression flag, the depression score
+and its confidence. Each result row is written (and flushed) as soon as
+its batch is done. Re-running
+with the same output file skips paths that are already in it.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from inference import analyze_many, clip_windows
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg")
+FIELDS = ["path", "emotion", "depression", "depression_score", "confidence", "n_windows",
+          "extract_seconds", "classify_seconds", "error"]
+
+
+def find_audio(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def _extract(path):
+    start = time.perf_counter()
+    try:
+        return path, clip_windows(path), time.perf_counter() - start, None
+    except Exception as e:
+        # Satu baris saja, agar baris CSV yang terpotong bisa dibuang per baris
+        message = " ".join(str(e).split())
+        return path, None, time.perf_counter() - start, f"{type(e).__name__}: {message}"
+
+
+class ResultWriter:
+    """Appends rows to a CSV or JSONL file, flushing after every batch."""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.endswith((".jsonl", ".json"))
+        self._drop_partial_line()
+        self._check_header()
+        self.done = self._read_done()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            if new_file:
+                self._csv.writeheader()
+
+    def _read_done(self):
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            if self.jsonl:
+                for line in f:
+                    try:
+                        done.add(json.loads(line)["path"])
+                    except (ValueError, KeyError):
+                        # Baris terakhir bisa terpotong jika proses sebelumnya crash
+                        continue
+            else:
+                # Baris yang kolomnya kurang (DictReader mengisi None) belum selesai
+                done.update(row["path"] for row in csv.DictReader(f)
+                            if row.get("path") and row.get("error") is not None)
+        return done
+
+    def _check_header(self):
+        # CSV lama dengan kolom berbeda tidak bisa dilanjutkan tanpa merusak barisnya
+        if self.jsonl or not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        if header != FIELDS:
+            raise ValueError(f"{self.path} has columns {header}, expected {FIELDS}; write to a new output file")
+
+    def _drop_partial_line(self):
+        # Baris terakhir tanpa newline terpotong oleh crash sebelumnya: buang,
+        # path-nya diproses ulang dan ditulis lengkap
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def write(self, rows):
+        for row in rows:
+            if self.jsonl:
+                self._file.write(json.dumps(row) + "\n")
+            else:
+                self._csv.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _classify_batch(batch):
+    rows = []
+    ok = [item for item in batch if item[3] is None]
+    analyses, share = [], 0.0
+    if ok:
+        # Semua jendela dari semua klip di batch: satu panggilan predict_proba
+        start = time.perf_counter()
+        analyses = analyze_many([item[1] for item in ok])
+        share = (time.perf_counter() - start) / len(ok)
+    results = dict(zip([item[0] for item in ok], analyses))
+    for path, _, extract_seconds, error in batch:
+        result = results.get(path, {})
+        rows.append({
+            "path": path,
+            "emotion": result.get("emotion", ""),
+            "depression": result.get("depression", ""),
+            "depression_score": round(result["depression_score"], 6) if result else "",
+            "confidence": round(result["confidence"], 6) if result else "",
+            "n_windows": result.get("n_windows", ""),
+            "extract_seconds": round(extract_seconds, 6),
+            "classify_seconds": round(share, 6) if error is None else "",
+            "error": error or "",
+        })
+    return rows
+
+
+def run(root, output, workers=None, batch_size=64):
+    writer = ResultWriter(output)
+    paths = [p for p in find_audio(root) if p not in writer.done]
+    skipped = len(writer.done)
+    counts = {"processed": 0, "errors": 0}
+    start = time.perf_counter()
+
+    def flush(batch):
+        rows = _classify_batch(batch)
+        writer.write(rows)
+        counts["processed"] += len(rows)
+        counts["errors"] += sum(1 for r in rows if r["error"])
+
+    try:
+        with Pool(processes=workers) as pool:
+            batch = []
+            for item in pool.imap_unordered(_extract, paths, chunksize=8):
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "processed": counts["processed"],
+        "errors": counts["errors"],
+        "skipped": skipped,
+        "seconds": elapsed,
+        "files_per_second": counts["processed"] / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch emotion/depression classification")
+    parser.add_argument("root", help="directory to scan for audio files")
+    parser.add_argument("-o", "--output", default="results.csv", help="output .csv or .jsonl file")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("-b", "--batch-size", type=int, default=64, help="files per classification batch")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+    summary = run(args.root, args.output, workers=args.workers, batch_size=args.batch_size)
+    print(
+        f"{summary['processed']} files ({summary['errors']} errors, {summary['skipped']} already done) "
+        f"in {summary['seconds']:.1f}s -> {summary['files_per_second']:.1f} files/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
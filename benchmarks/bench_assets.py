@@ -0,0 +1,64 @@
+"""Per-rerun cost of the background CSS and team photos, before and after the asset cache.
+
+    python -m benchmarks.bench_assets
+"""
+import base64
+import hashlib
+import time
+
+import numpy as np
+
+from assets import background_css, load_asset
+
+BACKGROUND = "static/images/bluebg.jpg"
+PHOTOS = ["static/images/rifat.jpeg", "static/images/faiz.jpg", "static/images/serigala.jpg"]
+PHOTO_WIDTH = 480
+
+
+def legacy_background_css(image_file):
+    # add_background sebelum lapisan aset: baca + base64 di setiap rerun
+    with open(image_file, "rb") as image:
+        encoded_string = base64.b64encode(image.read()).decode()
+    return f"""
+        <style>
+        .stApp {{
+            background-image: url("data:image/png;base64,{encoded_string}");
+            background-size: cover;
+            background-position: center;
+        }}
+        </style>
+        """
+
+
+def legacy_photo(path):
+    # st.image(path) membaca file dan meng-hash isinya di setiap rerun
+    with open(path, "rb") as f:
+        data = f.read()
+    hashlib.md5(data).hexdigest()
+    return data
+
+
+def timed(fn, repeat=200):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, 1000 * float(np.median(samples))
+
+
+def main():
+    old_css, old_css_ms = timed(lambda: legacy_background_css(BACKGROUND))
+    new_css, new_css_ms = timed(lambda: background_css(BACKGROUND))
+    old_photos, old_photo_ms = timed(lambda: [legacy_photo(p) for p in PHOTOS])
+    new_photos, new_photo_ms = timed(lambda: [load_asset(p, max_width=PHOTO_WIDTH).data for p in PHOTOS])
+
+    print(f"{'':<34}{'before':>12}{'after':>12}")
+    print(f"{'background CSS per rerun (bytes)':<34}{len(old_css):>12}{len(new_css):>12}")
+    print(f"{'background CSS render (ms)':<34}{old_css_ms:>12.3f}{new_css_ms:>12.3f}")
+    print(f"{'team photos payload (bytes)':<34}{sum(map(len, old_photos)):>12}{sum(map(len, new_photos)):>12}")
+    print(f"{'team photos prepare (ms)':<34}{old_photo_ms:>12.3f}{new_photo_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
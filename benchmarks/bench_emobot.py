@@ -0,0 +1,107 @@
+"""EmoBot lookup latency with a large synthetic FAQ, plus the bundled intents.
+
+    python -m benchmarks.bench_emobot --intents 20000
+
+Queries are exact patterns, the same patterns with case/punctuation/space
+noise, patterns with one typo per query, and unrelated text. Latencies
+are measured without the LRU cache (every lookup does the full match) and
+then with it.
+"""
+import argparse
+import random
+import string
+import time
+
+import numpy as np
+
+from emobot import IntentIndex, normalize
+
+
+def make_vocabulary(size, rng):
+    syllables = [c + v for c in "bcdfghjklmnprstw" for v in "aiueo"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_intents(n, vocabulary, rng):
+    # Frekuensi kata mengikuti distribusi Zipf seperti teks FAQ sungguhan
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    intents = []
+    for i in range(n):
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(3, 8))
+        intents.append({"patterns": [" ".join(words)], "response": f"jawaban {i}"})
+    return intents
+
+
+def typo(text, rng):
+    words = text.split()
+    i = max(range(len(words)), key=lambda j: len(words[j]))
+    word = list(words[i])
+    pos = rng.randrange(len(word))
+    word[pos] = rng.choice([c for c in string.ascii_lowercase if c != word[pos]])
+    words[i] = "".join(word)
+    return " ".join(words)
+
+
+def noisy(text, rng):
+    return "  " + " ".join(w.upper() if rng.random() < 0.3 else w for w in text.split()) + " ?!"
+
+
+def latency(index, queries, expected=None):
+    samples, correct = [], 0
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        result = index.match(query)
+        samples.append(time.perf_counter() - start)
+        if expected is not None:
+            correct += result == expected[i]
+    us = 1e6 * np.array(samples)
+    return {"p50_us": float(np.percentile(us, 50)), "p99_us": float(np.percentile(us, 99)),
+            "max_us": float(us.max()), "accuracy": correct / len(queries) if expected is not None else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--intents", type=int, default=20000)
+    parser.add_argument("--vocabulary", type=int, default=8000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    intents = make_intents(args.intents, make_vocabulary(args.vocabulary, rng), rng)
+    start = time.perf_counter()
+    uncached = IntentIndex(intents, cache_size=0)
+    build_s = time.perf_counter() - start
+    cached = IntentIndex(intents)
+
+    # Hanya pola unik yang punya jawaban benar yang pasti
+    sample = [i for i in rng.sample(range(args.intents), args.queries)
+              if uncached.exact[normalize(intents[i]["patterns"][0])] == i]
+    patterns = [intents[i]["patterns"][0] for i in sample]
+    suites = {
+        "exact": (patterns, sample),
+        "noisy": ([noisy(p, rng) for p in patterns], sample),
+        "typo": ([typo(p, rng) for p in patterns], sample),
+        "unrelated": (["".join(rng.choices(string.ascii_lowercase + " ", k=30)) for _ in sample], None),
+    }
+
+    print(f"{args.intents} intents, {len(uncached.idf)} distinct tokens, index built in {build_s:.2f} s")
+    print(f"{'queries':<12}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'matched':>10}")
+    for name, (queries, expected) in suites.items():
+        stats = latency(uncached, queries, expected)
+        accuracy = "" if stats["accuracy"] is None else f"{stats['accuracy']:.1%}"
+        print(f"{name:<12}{stats['p50_us']:>10.1f}{stats['p99_us']:>10.1f}{stats['max_us']:>10.1f}{accuracy:>10}")
+    queries = suites["typo"][0]
+    latency(cached, queries)
+    stats = latency(cached, queries)
+    print(f"{'typo cached':<12}{stats['p50_us']:>10.1f}{stats['p99_us']:>10.1f}{stats['max_us']:>10.1f}")
+
+    bundled = IntentIndex.from_file()
+    stats = latency(IntentIndex.from_file(cache_size=0), ["apa itu knn?", "Bagaimana cara kerja deteksi emosii"] * 200)
+    print(f"bundled intents ({len(bundled)}): p50 {stats['p50_us']:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Per-clip timing of the legacy extract_features against FeatureExtractor.
+
+    python -m benchmarks.bench_features --limit 50
+"""
+import argparse
+import glob
+import os
+import time
+
+import librosa
+import numpy as np
+
+from features import FeatureExtractor
+
+DATA_DIR = "data/TESS Toronto emotional speech set data"
+
+
+def legacy_extract_features(file_path):
+    # Salinan extract_features sebelum pipeline satu-STFT, sebagai pembanding
+    audio, src = librosa.load(file_path)
+    mfccs = librosa.feature.mfcc(y=audio, sr=src, n_mfcc=13)
+    mfccs = np.mean(mfccs.T, axis=0)
+    chroma = librosa.feature.chroma_stft(y=audio, sr=src)
+    mean_chroma = np.mean(chroma, axis=1)
+    mfccs_delta = librosa.feature.delta(librosa.feature.mfcc(y=audio, sr=src, n_mfcc=13))
+    mfccs_delta = np.mean(mfccs_delta.T, axis=0)
+    mfccs_delta2 = librosa.feature.delta(librosa.feature.mfcc(y=audio, sr=src, n_mfcc=13), order=2)
+    mfccs_delta2 = np.mean(mfccs_delta2.T, axis=0)
+    return np.concatenate([mfccs, mfccs_delta, mfccs_delta2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, "**", "*.wav"), recursive=True))[:args.limit]
+    if not paths:
+        raise SystemExit(f"No .wav files found under {args.data_dir}")
+    extractor = FeatureExtractor()
+
+    # Pemanasan (cache filter mel, JIT numba) sebelum pengukuran
+    legacy_extract_features(paths[0])
+    extractor(paths[0])
+
+    legacy_times, new_times = [], []
+    for path in paths:
+        start = time.perf_counter()
+        expected = legacy_extract_features(path)
+        legacy_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        actual = extractor(path)
+        new_times.append(time.perf_counter() - start)
+
+        if not np.array_equal(expected, actual):
+            raise SystemExit(f"Feature mismatch for {path}")
+
+    legacy_ms = 1000 * np.median(legacy_times)
+    new_ms = 1000 * np.median(new_times)
+    print(f"clips: {len(paths)} (outputs bit-identical)")
+    print(f"legacy extract_features : {legacy_ms:8.2f} ms/clip (median)")
+    print(f"FeatureExtractor        : {new_ms:8.2f} ms/clip (median)")
+    print(f"speedup                 : {legacy_ms / new_ms:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Stage-by-stage benchmark of the Submit inference path on the TESS clips.
+
+    python -m benchmarks.bench_pipeline --clips 50 --output bench.json
+    python -m benchmarks.bench_pipeline --baseline bench.json        # flag regressions
+    python -m benchmarks.bench_pipeline --profile knn_predict_b100   # cProfile + collapsed stacks
+
+Each stage is timed on its own inputs (decoded audio, spectrograms, MFCC
+matrices, scaled feature batches), so a regression points at one stage.
+Peak memory is measured in a separate tracemalloc pass so it does not
+skew the timings.
+"""
+import argparse
+import cProfile
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import librosa
+import numpy as np
+
+from features import FeatureExtractor, extract_features
+from model_registry import get_model
+
+DATA_DIR = "data/TESS Toronto emotional speech set data"
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+def build_stages(paths, batch_sizes=BATCH_SIZES):
+    """Stage name -> (function, list of inputs, items per call)."""
+    extractor = FeatureExtractor(blocks=("mfcc", "chroma", "mfcc_delta", "mfcc_delta2"))
+    clips = [librosa.load(p) for p in paths]
+    spectrograms = [(extractor.spectrogram(y), sr) for y, sr in clips]
+    mfccs = [extractor.mfcc(S, sr) for S, sr in spectrograms]
+    features = np.vstack([extract_features(c) for c in clips])
+    knn, scaler = get_model()
+    scaled = scaler.transform(features)
+
+    def batches(matrix, size):
+        reps = int(np.ceil(size / len(matrix)))
+        tiled = np.tile(matrix, (reps, 1))[:size]
+        return [tiled]
+
+    stages = {
+        "decode": (librosa.load, paths, 1),
+        "stft": (lambda clip: extractor.spectrogram(clip[0]), clips, 1),
+        "mfcc": (lambda spec: extractor.mfcc(*spec), spectrograms, 1),
+        "mfcc_delta": (lambda m: librosa.feature.delta(m), mfccs, 1),
+        "mfcc_delta2": (lambda m: librosa.feature.delta(m, order=2), mfccs, 1),
+        "chroma": (lambda spec: librosa.feature.chroma_stft(S=spec[0], sr=spec[1]), spectrograms, 1),
+        "extract_features": (extract_features, paths, 1),
+        "scaler_transform": (lambda row: scaler.transform(row[None, :]), list(features), 1),
+    }
+    for size in batch_sizes:
+        stages[f"knn_predict_b{size}"] = (knn.predict, batches(scaled, size), size)
+    return stages
+
+
+def time_stage(fn, inputs, repeat, min_calls=20):
+    fn(inputs[0])  # pemanasan
+    samples = []
+    calls = max(min_calls, len(inputs)) * repeat
+    for i in range(calls):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return np.array(samples)
+
+
+def peak_memory(fn, inputs):
+    tracemalloc.start()
+    try:
+        fn(inputs[0])
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(samples, items_per_call, peak_bytes):
+    ms = samples * 1000
+    return {
+        "calls": int(len(samples)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "throughput_per_s": float(items_per_call * len(samples) / samples.sum()),
+        "peak_memory_bytes": int(peak_bytes),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, stats in results["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if old and stats["p50_ms"] > old["p50_ms"] * (1 + tolerance):
+            regressions.append((name, old["p50_ms"], stats["p50_ms"]))
+    return regressions
+
+
+class StackCollector:
+    """Deterministic tracer that writes Brendan Gregg's collapsed-stack format."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.stack = []
+
+    def _frame_name(self, frame, event, arg):
+        if event.startswith("c_"):
+            return f"{getattr(arg, '__module__', None) or 'builtins'}.{arg.__name__}"
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def __call__(self, frame, event, arg):
+        now = time.perf_counter()
+        if event in ("call", "c_call"):
+            self.stack.append([self._frame_name(frame, event, arg), now, 0.0])
+        elif event in ("return", "c_return", "c_exception") and self.stack:
+            name, start, child = self.stack.pop()
+            elapsed = now - start
+            path = ";".join([entry[0] for entry in self.stack] + [name])
+            self.totals[path] += elapsed - child
+            if self.stack:
+                self.stack[-1][2] += elapsed
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, seconds in sorted(self.totals.items()):
+                micros = int(seconds * 1e6)
+                if micros:
+                    f.write(f"{stack} {micros}\n")
+
+
+def profile_stage(name, stage, out_dir):
+    fn, inputs, _ = stage
+    fn(inputs[0])
+    os.makedirs(out_dir, exist_ok=True)
+    prof_path = os.path.join(out_dir, f"{name}.prof")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for item in inputs:
+        fn(item)
+    profiler.disable()
+    profiler.dump_stats(prof_path)
+
+    collector = StackCollector()
+    sys.setprofile(collector)
+    try:
+        for item in inputs:
+            fn(item)
+    finally:
+        sys.setprofile(None)
+    folded_path = os.path.join(out_dir, f"{name}.folded")
+    collector.write(folded_path)
+    return prof_path, folded_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inference hot path stage by stage")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--clips", type=int, default=50, help="number of TESS clips to use")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the inputs per stage")
+    parser.add_argument("--stages", nargs="*", help="only run these stages")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare p50 against a previous JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown vs baseline")
+    parser.add_argument("--profile", metavar="STAGE", help="write cProfile (.prof) and collapsed stacks (.folded) for STAGE")
+    parser.add_argument("--profile-dir", default="bench_profiles")
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, "**", "*.wav"), recursive=True))
+    # Ambil sampel merata dari semua folder emosi
+    paths = paths[::max(1, len(paths) // args.clips)][:args.clips]
+    if not paths:
+        raise SystemExit(f"No .wav files found under {args.data_dir}")
+    stages = build_stages(paths)
+
+    if args.profile:
+        if args.profile not in stages:
+            raise SystemExit(f"Unknown stage {args.profile!r}; choose from {', '.join(stages)}")
+        for path in profile_stage(args.profile, stages[args.profile], args.profile_dir):
+            print(f"wrote {path}")
+        return
+
+    selected = args.stages or list(stages)
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "librosa": librosa.__version__,
+        "machine": platform.machine(),
+        "clips": len(paths),
+        "stages": {},
+    }
+    print(f"{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}{'peak MiB':>10}")
+    for name in selected:
+        fn, inputs, items = stages[name]
+        samples = time_stage(fn, inputs, args.repeat)
+        stats = summarize(samples, items, peak_memory(fn, inputs))
+        results["stages"][name] = stats
+        print(f"{name:<20}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+              f"{stats['throughput_per_s']:>12.1f}{stats['peak_memory_bytes'] / 2**20:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: p50 {old:.3f} ms -> {new:.3f} ms")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
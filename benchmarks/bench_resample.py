@@ -0,0 +1,66 @@
+"""Cost and accuracy of the soxr resample qualities on the TESS set (24414 Hz -> 22050 Hz).
+
+    python -m benchmarks.bench_resample --clips 200 --quality HQ MQ LQ
+
+For every quality: median resample and load+features time per clip, the
+hold-out accuracy of a model trained on features of that quality (same
+scaler / 80-20 split / k=5 as train.py) and the accuracy of the shipped HQ
+setting's model on that quality's test features, i.e. what happens when
+EMOVOICE_RES_QUALITY is changed without retraining.
+"""
+import argparse
+import json
+
+import numpy as np
+import soundfile as sf
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from audio_io import QUALITIES, resample
+from benchmarks.bench_vad import holdout_accuracy, median_ms
+from feature_cache import FeatureCache
+from features import FeatureExtractor
+from knn import KNearestNeighbors
+from train import DATA_DIR, discover_dataset
+
+
+def cross_accuracy(X_fit, X_eval, y, k=5, test_size=0.2, random_state=42):
+    # Model dilatih pada fitur X_fit, diuji pada baris uji yang sama dari X_eval
+    idx_train, idx_test = train_test_split(np.arange(len(y)), test_size=test_size, random_state=random_state)
+    scaler = StandardScaler().fit(X_fit)
+    knn = KNearestNeighbors(k=k).fit(scaler.transform(X_fit[idx_train]), y[idx_train])
+    return float(np.mean(knn.predict(scaler.transform(X_eval[idx_test])) == y[idx_test]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--clips", type=int, default=200, help="clips used for the latency measurement")
+    parser.add_argument("--quality", nargs="+", choices=QUALITIES, default=["HQ", "MQ", "LQ"])
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    data = discover_dataset(args.data_dir)
+    paths = [p for p, _ in data]
+    y = np.array([label for _, label in data], dtype=object)
+    sample = paths[:: max(1, len(paths) // args.clips)][: args.clips]
+    raw = [sf.read(p, dtype="float32") for p in sample]
+
+    features = {q: FeatureCache(extractor=FeatureExtractor(res_quality=q)).extract_many(paths, args.workers)
+                for q in set(args.quality) | {"HQ"}}
+    report = {"clips": len(paths), "native_sr": sorted({sr for _, sr in raw}), "qualities": {}}
+    for quality in args.quality:
+        extractor = FeatureExtractor(res_quality=quality)
+        extractor(sample[0])
+        report["qualities"][quality] = {
+            "resample_ms": median_ms(lambda clip: resample(clip[0], clip[1], extractor.sr, quality), raw),
+            "load_features_ms": median_ms(extractor, sample),
+            "accuracy_retrained": holdout_accuracy(features[quality], y),
+            "accuracy_hq_model": cross_accuracy(features["HQ"], features[quality], y),
+            "max_feature_delta_vs_hq": float(np.abs(features[quality] - features["HQ"]).max()),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Effect of the energy VAD pre-stage on the TESS set: audio dropped, latency, accuracy.
+
+    python -m benchmarks.bench_vad --clips 200
+
+Accuracy uses the same scaler / 80-20 split / k=5 as train.py, once with
+features from the raw clips and once with silence removed. Features come
+from the feature cache, so only the first run extracts all 2800 clips.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from feature_cache import FeatureCache
+from features import FeatureExtractor
+from knn import KNearestNeighbors
+from train import DATA_DIR, discover_dataset
+from vad import voiced_mask
+
+
+def holdout_accuracy(X, y, k=5, test_size=0.2, random_state=42):
+    X_scaled = StandardScaler().fit_transform(X)
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=test_size, random_state=random_state)
+    knn = KNearestNeighbors(k=k).fit(X_train, y_train)
+    return float(np.mean(knn.predict(X_test) == y_test))
+
+
+def median_ms(fn, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return 1000 * float(np.median(samples))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--clips", type=int, default=200, help="clips used for the latency measurement")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    data = discover_dataset(args.data_dir)
+    paths = [p for p, _ in data]
+    y = np.array([label for _, label in data], dtype=object)
+    plain, trimmed = FeatureExtractor(), FeatureExtractor(vad=True)
+
+    clips = [plain.load(p) for p in paths]
+    dropped = np.array([1.0 - voiced_mask(audio, sr).mean() for audio, sr in clips])
+
+    sample = clips[:: max(1, len(clips) // args.clips)][: args.clips]
+    plain.from_audio(*sample[0])
+    trimmed.from_audio(*sample[0])
+    report = {
+        "clips": len(paths),
+        "audio_dropped_mean": float(dropped.mean()),
+        "audio_dropped_median": float(np.median(dropped)),
+        "vad_ms": median_ms(lambda clip: voiced_mask(*clip), sample),
+        "features_ms": median_ms(lambda clip: plain.from_audio(*clip), sample),
+        "features_vad_ms": median_ms(lambda clip: trimmed.from_audio(*clip), sample),
+        "accuracy": holdout_accuracy(FeatureCache(extractor=plain).extract_many(paths, args.workers), y),
+        "accuracy_vad": holdout_accuracy(FeatureCache(extractor=trimmed).extract_many(paths, args.workers), y),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
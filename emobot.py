@@ -0,0 +1,221 @@
+"""Intent matcher for EmoBot.
+
+Patterns and responses live in a JSON file (``data/emobot_intents.json`` or
+``$EMOVOICE_INTENTS_PATH``):
+
+    {"fallback": "...", "intents": [{"patterns": ["halo", ...], "response": "..."}, ...]}
+
+The index is built once per process. A query is normalized (case,
+accents, punctuation, whitespace) and looked up exactly first. Otherwise
+each token is matched against the vocabulary through a symmetric-delete
+index, allowing a bounded edit distance. Every pattern is then scored
+against the matched tokens (IDF-weighted Dice) in one vectorized pass
+over their postings. Answers for repeated queries come from an LRU
+cache.
+"""
+import functools
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+INTENTS_PATH = os.environ.get("EMOVOICE_INTENTS_PATH", "data/emobot_intents.json")
+DEFAULT_FALLBACK = "Sorry Gw Gapaham, Bisa Di Ulangi ?"
+# Skor minimum (Dice berbobot IDF, 0..1) agar sebuah pola dianggap cocok
+MIN_SCORE = 0.6
+# Bobot token yang cocok lewat koreksi typo dikurangi per edit
+EDIT_PENALTY = 0.2
+CACHE_SIZE = 4096
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    # Apostrof dibuang tanpa spasi: "assalamu'alaikum" -> "assalamualaikum"
+    text = _NON_WORD.sub(lambda m: "" if m.group() in "'’`" else " ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+MAX_EDITS = 2
+# Varian hapus hanya dibuat dari awalan kata (trik SymSpell); kandidat tetap
+# diverifikasi dengan jarak edit penuh
+PREFIX_LENGTH = 7
+
+
+def max_edits(token):
+    # Token pendek hanya boleh cocok persis; makin panjang, makin toleran typo
+    if len(token) <= 2:
+        return 0
+    return 1 if len(token) <= 5 else 2
+
+
+def _deletes(word, depth):
+    # Semua varian kata dengan paling banyak `depth` huruf dihapus
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i]
+        for j, cb in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1, previous[j - 1] + (ca != cb)))
+        if min(row) > limit:
+            return limit + 1
+        previous = row
+    return previous[-1]
+
+
+class FuzzyVocabulary:
+    """Symmetric-delete index over the vocabulary.
+
+    Every word is stored under all variants of its prefix with up to
+    MAX_EDITS letters deleted. A query token only generates the delete
+    variants of its own prefix and looks them up, so a typo costs a few
+    dozen dict lookups instead of a scan over the vocabulary.
+    """
+
+    def __init__(self, words=()):
+        self.deletes = {}
+        self.max_length = 0
+        for word in words:
+            self.max_length = max(self.max_length, len(word))
+            for variant in _deletes(word[:PREFIX_LENGTH], MAX_EDITS):
+                self.deletes.setdefault(variant, []).append(word)
+
+    def search(self, word, limit):
+        """``{vocab_word: distance}`` for every word within ``limit`` edits of ``word``."""
+        if len(word) > self.max_length + limit:
+            return {}
+        candidates = set()
+        for variant in _deletes(word[:PREFIX_LENGTH], limit):
+            candidates.update(self.deletes.get(variant, ()))
+        found = {}
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                found[candidate] = distance
+        return found
+
+
+class IntentIndex:
+    def __init__(self, intents, fallback=DEFAULT_FALLBACK, min_score=MIN_SCORE, cache_size=CACHE_SIZE):
+        self.fallback = fallback
+        self.min_score = min_score
+        self.responses = []
+        self.exact = {}
+        self.pattern_tokens = []
+        self.pattern_intent = []
+        postings = {}
+        for intent in intents:
+            intent_id = len(self.responses)
+            self.responses.append(intent["response"])
+            for pattern in intent["patterns"]:
+                norm = normalize(pattern)
+                if not norm:
+                    continue
+                self.exact.setdefault(norm, intent_id)
+                tokens = frozenset(norm.split())
+                pattern_id = len(self.pattern_tokens)
+                self.pattern_tokens.append(tokens)
+                self.pattern_intent.append(intent_id)
+                for token in tokens:
+                    postings.setdefault(token, []).append(pattern_id)
+        n_patterns = max(1, len(self.pattern_tokens))
+        self.idf = {token: math.log(1 + n_patterns / len(ids)) for token, ids in postings.items()}
+        self.postings = {token: np.array(ids, dtype=np.intp) for token, ids in postings.items()}
+        self.pattern_weight = np.array([sum(self.idf[t] for t in tokens) for tokens in self.pattern_tokens])
+        self.vocabulary = FuzzyVocabulary(postings)
+        self._lookup = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    @classmethod
+    def from_file(cls, path=INTENTS_PATH, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and "intents" not in data:
+            # Bentuk sederhana: {"pola": "jawaban", ...}
+            data = {"intents": [{"patterns": [k], "response": v} for k, v in data.items()]}
+        return cls(data["intents"], fallback=data.get("fallback", DEFAULT_FALLBACK), **kwargs)
+
+    def __len__(self):
+        return len(self.responses)
+
+    def respond(self, text):
+        intent_id = self.match(text)
+        return self.fallback if intent_id is None else self.responses[intent_id]
+
+    def match(self, text):
+        """Intent id for ``text``, or None when nothing scores at least ``min_score``."""
+        return self._lookup(normalize(text))
+
+    def cache_info(self):
+        return self._lookup.cache_info()
+
+    def _match(self, query):
+        if not query:
+            return None
+        intent_id = self.exact.get(query)
+        if intent_id is not None:
+            return intent_id
+
+        # Token kueri -> (token kosakata, bobot) setelah koreksi typo
+        matched = {}
+        query_weight = 0.0
+        for token in set(query.split()):
+            if token in self.idf:
+                candidates = {token: 0}
+            else:
+                candidates = self.vocabulary.search(token, max_edits(token)) if max_edits(token) else {}
+            if not candidates:
+                # Token tak dikenal tetap dihitung di bobot kueri (bobot idf maksimum)
+                query_weight += math.log(1 + len(self.pattern_tokens))
+                continue
+            best = max(candidates, key=lambda word: (self.idf[word] * (1 - EDIT_PENALTY * candidates[word]), word))
+            weight = self.idf[best]
+            matched[best] = weight * (1 - EDIT_PENALTY * candidates[best])
+            query_weight += weight
+        if not matched:
+            return None
+
+        # Skor Dice berbobot untuk semua pola sekaligus dari posting token yang
+        # cocok; argmax memilih pola yang didefinisikan lebih dulu jika seri
+        ids = np.concatenate([self.postings[token] for token in matched])
+        weights = np.concatenate([np.full(len(self.postings[token]), w) for token, w in matched.items()])
+        hits = np.bincount(ids, weights=weights, minlength=len(self.pattern_weight))
+        scores = 2 * hits / (query_weight + self.pattern_weight)
+        best_id = int(np.argmax(scores))
+        if scores[best_id] < self.min_score:
+            return None
+        return self.pattern_intent[best_id]
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_index():
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = IntentIndex.from_file()
+    return _default_index
+
+
+def emobot_response(user_input):
+    return get_index().respond(user_input)
@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: tanpa kunci antar-proses, satu proses penulis per direktori cache
+    fcntl = None
+
+import numpy as np
+
+from features import default_extractor
+from metrics import metrics
+
+CACHE_DIR = ".cache/features"
+MAX_BYTES = 256 * 1024 * 1024
+# Log index dipadatkan menjadi snapshot index.json setelah sebanyak ini baris
+COMPACT_EVERY = 4096
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hash(source):
+    if isinstance(source, (str, os.PathLike)):
+        return file_hash(source)
+    if isinstance(source, tuple):
+        audio, sr = source
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        return content_hash(audio.tobytes() + str(sr).encode())
+    if isinstance(source, np.ndarray):
+        return content_hash(np.ascontiguousarray(source, dtype=np.float32).tobytes())
+    return content_hash(bytes(source))
+
+
+def _file_id(path):
+    # Inode + mtime: berubah setiap kali file diganti lewat os.replace
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino, st.st_mtime_ns
+
+
+def params_digest(params):
+    return content_hash(json.dumps(params, sort_keys=True).encode())[:16]
+
+
+class FeatureCache:
+    """On-disk feature store keyed by audio content hash.
+
+    Each extractor configuration gets its own namespace directory (named
+    after a digest of its version and parameters), so changing any
+    parameter never serves stale vectors. Inside a namespace the vectors
+    live in one memory-mapped ``features.npy``. The index (content hash ->
+    row) is a snapshot ``index.json`` plus an append-only ``index.log``:
+    a put appends one line, and the log is folded into a new snapshot
+    every ``COMPACT_EVERY`` lines or on ``flush()``. Rows are evicted
+    least-recently-used once the store exceeds ``max_bytes``.
+
+    Several processes may share a namespace (the app, train.py, tune.py).
+    Every get and put holds an ``flock`` on the namespace's ``lock`` file
+    and first replays what other writers appended, reopening
+    ``features.npy`` when another writer has grown it.
+    """
+
+    def __init__(self, root=CACHE_DIR, extractor=default_extractor, max_bytes=MAX_BYTES):
+        self.extractor = extractor
+        self.n_features = extractor.n_features
+        self.row_bytes = self.n_features * np.dtype(np.float64).itemsize
+        self.max_rows = max(1, max_bytes // self.row_bytes)
+        self.namespace = params_digest(extractor.params())
+        self.root = root
+        self.path = os.path.join(root, self.namespace)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(self.path, "index.json")
+        self._log_path = os.path.join(self.path, "index.log")
+        self._array_path = os.path.join(self.path, "features.npy")
+        self._index_id = self._array_id = None
+        self.array = self.free = None
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.path, "lock"), "a")
+        # _sync memuat index pertama kali (dan membuat file jika belum ada)
+        with self._locked(exclusive=True):
+            pass
+
+    @contextmanager
+    def _locked(self, exclusive):
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._sync()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        # Ikuti perubahan dari proses lain sejak operasi terakhir
+        if (self.free is None or _file_id(self._index_path) != self._index_id
+                or self._log_size() < self._log_offset):
+            # Belum dimuat, atau snapshot baru dari penulis lain: muat ulang semuanya
+            self._load()
+            return
+        if _file_id(self._array_path) != self._array_id:
+            self._open_array()
+        self._replay()
+
+    def _load(self):
+        self.entries, self.clock, self.free = {}, 0, None
+        self._log_offset = self._log_lines = 0
+        self._index_id = _file_id(self._index_path)
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+            self.entries = {k: tuple(v) for k, v in index["entries"].items()}
+            self.clock = index["clock"]
+            self._open_array()
+            self._replay()
+        except (ValueError, KeyError, TypeError, OSError):
+            # Index rusak, hilang atau tidak cocok: mulai dari kosong
+            self._reset()
+        used = {row for row, _ in self.entries.values()}
+        self.free = set(range(len(self.array))) - used
+
+    def _reset(self):
+        self.entries, self.clock = {}, 0
+        self.array = self._allocate(64)
+        self._array_id = _file_id(self._array_path)
+        self._compact()
+
+    def _open_array(self):
+        old_rows = 0 if self.array is None else len(self.array)
+        array = np.load(self._array_path, mmap_mode="r+")
+        if array.ndim != 2 or array.shape[1] != self.n_features:
+            raise ValueError("feature dimension changed")
+        self.array = array
+        self._array_id = _file_id(self._array_path)
+        if self.free is not None:
+            # Baris baru dari penulis lain; yang sudah terpakai dibuang oleh _replay
+            self.free.update(range(old_rows, len(array)))
+
+    def _log_size(self):
+        try:
+            return os.path.getsize(self._log_path)
+        except FileNotFoundError:
+            return 0
+
+    def _replay(self):
+        try:
+            with open(self._log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Baris terakhir tanpa newline (penulis mati di tengah jalan) diabaikan
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode().splitlines():
+            op, key, *rest = line.split()
+            if op == "+":
+                row, clock = int(rest[0]), int(rest[1])
+                self.entries[key] = (row, clock)
+                self.clock = max(self.clock, clock)
+                if self.free is not None:
+                    self.free.discard(row)
+            else:
+                entry = self.entries.pop(key, None)
+                if entry is not None and self.free is not None:
+                    self.free.add(entry[0])
+            self._log_lines += 1
+        self._log_offset += end
+
+    def _append(self, lines):
+        with open(self._log_path, "ab") as f:
+            # Buang sisa baris yang terpotong agar baris baru tidak menempel padanya
+            f.truncate(self._log_offset)
+            f.write("".join(lines).encode())
+            self._log_offset = f.tell()
+        self._log_lines += len(lines)
+        if self._log_lines >= COMPACT_EVERY:
+            self._compact()
+
+    def _compact(self):
+        self.array.flush()
+        with open(self._index_path + ".tmp", "w") as f:
+            json.dump({"params": self.extractor.params(), "clock": self.clock, "entries": self.entries}, f)
+        os.replace(self._index_path + ".tmp", self._index_path)
+        self._index_id = _file_id(self._index_path)
+        open(self._log_path, "wb").close()
+        self._log_offset = self._log_lines = 0
+
+    def _allocate(self, rows, old=None):
+        tmp_path = self._array_path + ".tmp"
+        array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(rows, self.n_features))
+        if old is not None:
+            array[:len(old)] = old
+            array.flush()
+            del old
+        os.replace(tmp_path, self._array_path)
+        return np.load(self._array_path, mmap_mode="r+")
+
+    def get(self, key):
+        with self._locked(exclusive=False):
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                metrics.inc("cache_misses_total", cache="features")
+                return None
+            self.hits += 1
+            metrics.inc("cache_hits_total", cache="features")
+            self.clock += 1
+            self.entries[key] = (entry[0], self.clock)
+            return np.array(self.array[entry[0]])
+
+    def put(self, key, features):
+        self.put_many([(key, features)])
+
+    def put_many(self, items):
+        """Store several ``(key, features)`` pairs under one lock and one log append."""
+        items = [(key, np.asarray(features, dtype=np.float64)) for key, features in items]
+        for _, features in items:
+            if features.shape != (self.n_features,):
+                raise ValueError(f"Expected {self.n_features} features, got shape {features.shape}")
+        with self._locked(exclusive=True):
+            lines = []
+            for key, features in items:
+                if key in self.entries:
+                    row = self.entries[key][0]
+                else:
+                    if len(self.entries) >= self.max_rows:
+                        # Buang sekaligus beberapa entri agar tidak mengurutkan ulang di setiap put
+                        lines += self._evict(len(self.entries) - self.max_rows + 1 + self.max_rows // 20)
+                    if not self.free:
+                        self._grow()
+                    row = self.free.pop()
+                self.clock += 1
+                self.array[row] = features
+                self.entries[key] = (row, self.clock)
+                lines.append(f"+ {key} {row} {self.clock}\n")
+            self._append(lines)
+
+    def _evict(self, count):
+        oldest = sorted(self.entries.items(), key=lambda item: item[1][1])[:count]
+        for key, (row, _) in oldest:
+            del self.entries[key]
+            self.free.add(row)
+        return [f"- {key}\n" for key, _ in oldest]
+
+    def _grow(self):
+        old_rows = len(self.array)
+        new_rows = min(max(old_rows * 2, 64), self.max_rows)
+        self.array.flush()
+        self.array = self._allocate(new_rows, old=self.array)
+        self._array_id = _file_id(self._array_path)
+        self.free.update(range(old_rows, new_rows))
+
+    def flush(self):
+        """Fold the log into a new ``index.json`` snapshot (also persists LRU order)."""
+        with self._locked(exclusive=True):
+            self._compact()
+
+    def purge_stale(self):
+        # Hapus namespace milik parameter ekstraktor lain
+        for name in os.listdir(self.root):
+            if name != self.namespace:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def extract(self, source):
+        key = source_hash(source)
+        features = self.get(key)
+        if features is None:
+            features = self.extractor(source)
+            self.put(key, features)
+        return features
+
+    def extract_many(self, paths, workers=None):
+        """Feature matrix for ``paths``; only cache misses are extracted, in a process pool."""
+        keys = [file_hash(p) for p in paths]
+        rows = [self.get(k) for k in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            with Pool(processes=workers) as pool:
+                computed = pool.map(self.extractor, [paths[i] for i in missing], chunksize=8)
+            self.put_many([(keys[i], features) for i, features in zip(missing, computed)])
+            for i, features in zip(missing, computed):
+                rows[i] = features
+        self.flush()
+        return np.vstack(rows) if rows else np.empty((0, self.n_features))
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "capacity": self.max_rows,
+            "namespace": self.namespace,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FeatureCache()
+    return _default_cache
+
+
+def cached_extract_features(source):
+    return get_cache().extract(source)
@@ -0,0 +1,187 @@
+import json
+import os
+
+import librosa
+import numpy as np
+
+from audio_io import QUALITIES, load_audio
+from vad import trim_silence
+
+# Urutan blok fitur yang dipakai model (39 dimensi) dan diharapkan scaler.joblib
+DEFAULT_BLOCKS = ("mfcc", "mfcc_delta", "mfcc_delta2")
+FEATURE_BLOCKS = ("mfcc", "chroma", "mfcc_delta", "mfcc_delta2")
+N_CHROMA = 12
+# Naikkan jika cara perhitungan fitur berubah; dipakai sebagai kunci cache fitur
+EXTRACTOR_VERSION = 1
+# Manifest model yang sedang dipasang (ditulis oleh train.promote); pengaturan
+# ekstraktor default diambil dari "features" di dalamnya
+MANIFEST_PATH = "model/manifest.json"
+# Parameter ekstraktor yang diambil dari manifest; env di bawah tetap menang
+MANIFEST_PARAMS = ("blocks", "res_quality", "vad")
+# EMOVOICE_VAD=1 membuang bagian hening sebelum ekstraksi fitur (default: dari
+# manifest, model yang dilatih dengan python train.py --vad)
+VAD_ENV = "EMOVOICE_VAD"
+# Blok fitur model yang dipakai, dipisah koma (default: dari manifest, mis.
+# model chroma dari tune.py --promote; tanpa manifest DEFAULT_BLOCKS)
+BLOCKS_ENV = "EMOVOICE_FEATURE_BLOCKS"
+# Kualitas resample soxr saat rate sumber != 22050 Hz (HQ, MQ, LQ, ...; default:
+# dari manifest, model yang dilatih dengan python train.py --res-quality MQ)
+RES_QUALITY_ENV = "EMOVOICE_RES_QUALITY"
+
+
+class FeatureExtractor:
+    """Computes the feature vector from a single power spectrogram.
+
+    The STFT is taken once per clip; MFCC, delta and delta-2 are derived
+    from the same MFCC matrix, and chroma is only computed when it is part
+    of ``blocks``. With ``vad=True`` silent frames are dropped (see vad.py)
+    before any of that.
+    """
+
+    def __init__(self, blocks=DEFAULT_BLOCKS, sr=22050, n_mfcc=13, n_fft=2048, hop_length=512, res_quality="HQ",
+                 vad=False):
+        unknown = [b for b in blocks if b not in FEATURE_BLOCKS]
+        if unknown:
+            raise ValueError(f"Unknown feature blocks: {unknown}")
+        if res_quality not in QUALITIES:
+            raise ValueError(f"res_quality must be one of {QUALITIES}, got {res_quality!r}")
+        self.blocks = tuple(blocks)
+        self.sr = sr
+        self.n_mfcc = n_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.res_quality = res_quality
+        self.vad = vad
+
+    @property
+    def n_features(self):
+        return sum(N_CHROMA if b == "chroma" else self.n_mfcc for b in self.blocks)
+
+    def params(self):
+        return {
+            "version": EXTRACTOR_VERSION,
+            "blocks": list(self.blocks),
+            "sr": self.sr,
+            "n_mfcc": self.n_mfcc,
+            "n_fft": self.n_fft,
+            "hop_length": self.hop_length,
+            "res_quality": self.res_quality,
+            "vad": self.vad,
+        }
+
+    def load(self, source):
+        return load_audio(source, sr=self.sr, quality=self.res_quality)
+
+    def prepare(self, audio, sr):
+        return trim_silence(audio, sr) if self.vad else audio
+
+    def spectrogram(self, audio):
+        # Sama dengan spektrogram daya yang dihitung librosa di dalam mfcc()
+        # dan chroma_stft(), sehingga hasilnya identik
+        return np.abs(librosa.stft(audio, n_fft=self.n_fft, hop_length=self.hop_length)) ** 2
+
+    def mfcc(self, S, sr):
+        mel = librosa.feature.melspectrogram(S=S, sr=sr, n_fft=self.n_fft, hop_length=self.hop_length)
+        return librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=sr, n_mfcc=self.n_mfcc)
+
+    def frame_blocks(self, S, sr):
+        """Frame-level matrices (block -> ``(dims, n_frames)``) for the configured blocks."""
+        out = {}
+        needs_mfcc = any(b.startswith("mfcc") for b in self.blocks)
+        if needs_mfcc:
+            mfccs = self.mfcc(S, sr)
+        for block in self.blocks:
+            if block == "mfcc":
+                out[block] = mfccs
+            elif block == "mfcc_delta":
+                out[block] = librosa.feature.delta(mfccs)
+            elif block == "mfcc_delta2":
+                out[block] = librosa.feature.delta(mfccs, order=2)
+            elif block == "chroma":
+                out[block] = librosa.feature.chroma_stft(S=S, sr=sr, n_fft=self.n_fft, hop_length=self.hop_length)
+        return out
+
+    def blocks_from_spectrogram(self, S, sr):
+        out = {}
+        for block, frames in self.frame_blocks(S, sr).items():
+            if block == "chroma":
+                out[block] = np.mean(frames, axis=1)
+            else:
+                out[block] = np.mean(frames.T, axis=0)
+        return out
+
+    def from_audio(self, audio, sr):
+        blocks = self.blocks_from_spectrogram(self.spectrogram(self.prepare(audio, sr)), sr)
+        return np.concatenate([blocks[b] for b in self.blocks])
+
+    def frames(self, seconds, sr):
+        """Number of STFT frames spanning ``seconds`` of audio."""
+        return max(1, int(round(seconds * sr / self.hop_length)))
+
+    def n_windows(self, n_samples, sr, window_seconds=3.0, hop_seconds=1.5):
+        # librosa.stft (center=True) menghasilkan 1 + n // hop frame
+        n_frames = 1 + n_samples // self.hop_length
+        win = self.frames(window_seconds, sr)
+        if n_frames <= win:
+            return 1
+        hop = self.frames(hop_seconds, sr)
+        return (n_frames - win) // hop + 1 + ((n_frames - win) % hop != 0)
+
+    def window_features(self, audio, sr, window_seconds=3.0, hop_seconds=1.5):
+        """Feature vectors of overlapping windows, one row per window.
+
+        The spectrogram, MFCC and delta matrices are computed once for the
+        whole clip and each window takes the mean over its slice of frames
+        (via cumulative sums), so a long recording costs about one pass
+        over the audio. A clip no longer than one window gives exactly
+        ``from_audio``'s vector.
+        """
+        S = self.spectrogram(self.prepare(audio, sr))
+        n_frames = S.shape[1]
+        win = self.frames(window_seconds, sr)
+        hop = self.frames(hop_seconds, sr)
+        if n_frames <= win:
+            blocks = self.blocks_from_spectrogram(S, sr)
+            return np.concatenate([blocks[b] for b in self.blocks])[None, :]
+        starts = list(range(0, n_frames - win + 1, hop))
+        if starts[-1] + win < n_frames:
+            # Jendela terakhir digeser agar ekor rekaman ikut dihitung
+            starts.append(n_frames - win)
+        starts = np.array(starts)
+        frames = self.frame_blocks(S, sr)
+        stacked = np.concatenate([frames[b] for b in self.blocks], axis=0)
+        cumsum = np.concatenate([np.zeros((stacked.shape[0], 1)), np.cumsum(stacked, axis=1)], axis=1)
+        return ((cumsum[:, starts + win] - cumsum[:, starts]) / win).T
+
+    def __call__(self, source):
+        audio, sr = self.load(source)
+        return self.from_audio(audio, sr)
+
+
+def manifest_params(path=MANIFEST_PATH):
+    """Extractor params of the promoted model (``"features"`` in its manifest), ``{}`` without one."""
+    try:
+        with open(path) as f:
+            return json.load(f).get("features", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _default_params():
+    # Nilai dari manifest dulu; env yang di-set menimpanya
+    params = {name: value for name, value in manifest_params().items() if name in MANIFEST_PARAMS}
+    if os.environ.get(BLOCKS_ENV):
+        params["blocks"] = os.environ[BLOCKS_ENV].split(",")
+    if os.environ.get(RES_QUALITY_ENV):
+        params["res_quality"] = os.environ[RES_QUALITY_ENV]
+    if os.environ.get(VAD_ENV):
+        params["vad"] = os.environ[VAD_ENV] == "1"
+    return params
+
+
+default_extractor = FeatureExtractor(**_default_params())
+
+
+def extract_features(source):
+    """Feature vector for a file path, encoded audio bytes or an ``(array, rate)`` pair."""
+    return default_extractor(source)
@@ -0,0 +1,112 @@
+import numpy as np
+
+from feature_cache import source_hash
+from features import default_extractor
+from metrics import metrics
+from model_registry import get_model
+
+# Emosi yang digolongkan sebagai indikasi depresi
+DEPRESSION_EMOTIONS = ("angry", "sad", "fear", "disgust")
+# Rekaman panjang dipotong menjadi jendela 3 detik (durasi rekaman mikrofon)
+# yang saling tumpang tindih 50%
+WINDOW_SECONDS = 3.0
+HOP_SECONDS = 1.5
+DEPRESSION_THRESHOLD = 0.5
+
+
+def is_depressed(emotion):
+    return emotion in DEPRESSION_EMOTIONS
+
+
+def classify(features):
+    """Scale and classify a batch of feature vectors in one KNN call.
+
+    Returns the predicted emotions and the matching depression flags.
+    """
+    knn, scaler = get_model()
+    features = np.atleast_2d(features)
+    with metrics.stage("predict"):
+        emotions = knn.predict(scaler.transform(features))
+    return emotions, [is_depressed(e) for e in emotions]
+
+
+def classify_proba(features):
+    """Distance-weighted class probabilities for a batch of feature vectors.
+
+    Returns ``(labels, proba)`` where ``proba[i, j]`` is the probability of
+    ``labels[j]`` for row ``i``.
+    """
+    knn, scaler = get_model()
+    with metrics.stage("predict"):
+        proba = knn.predict_proba(scaler.transform(np.atleast_2d(features)))
+    return [str(label) for label in knn.labels()], proba
+
+
+def depression_scores(labels, proba):
+    # Skor depresi = total probabilitas emosi yang tergolong depresi
+    mask = np.array([is_depressed(label) for label in labels])
+    return proba[:, mask].sum(axis=1)
+
+
+def clip_windows(source, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS, cache=None,
+                 extractor=default_extractor):
+    """Decode ``source`` and return the feature rows of its analysis windows.
+
+    All windows share one spectrogram. Clips no longer than one window are
+    looked up in ``cache`` (a ``FeatureCache``) when one is given.
+    """
+    with metrics.stage("decode"):
+        audio, sr = extractor.load(source)
+    if cache is not None and extractor.n_windows(len(audio), sr, window_seconds, hop_seconds) == 1:
+        key = source_hash(source)
+        features = cache.get(key)
+        if features is None:
+            with metrics.stage("features"):
+                features = extractor.from_audio(audio, sr)
+            cache.put(key, features)
+        return features[None, :]
+    with metrics.stage("features"):
+        return extractor.window_features(audio, sr, window_seconds, hop_seconds)
+
+
+def summarize(labels, proba, threshold=DEPRESSION_THRESHOLD):
+    """Clip-level emotion and depression decision from per-window probabilities.
+
+    The clip probabilities are the mean of the window probabilities;
+    ``confidence`` is the probability mass behind the depression decision
+    and ``window_agreement`` the fraction of windows that agree with it.
+    """
+    window_scores = depression_scores(labels, proba)
+    clip_proba = proba.mean(axis=0)
+    score = float(window_scores.mean())
+    depressed = score >= threshold
+    return {
+        "emotion": labels[int(np.argmax(clip_proba))],
+        "depression": bool(depressed),
+        "depression_score": score,
+        "confidence": score if depressed else 1.0 - score,
+        "window_agreement": float(np.mean((window_scores >= threshold) == depressed)),
+        "n_windows": len(proba),
+        "probabilities": {label: float(p) for label, p in zip(labels, clip_proba)},
+        "window_scores": window_scores.tolist(),
+    }
+
+
+def analyze_clip(source, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS,
+                 threshold=DEPRESSION_THRESHOLD, cache=None, extractor=default_extractor):
+    """Clip-level emotion and depression decision aggregated over windows.
+
+    The windows are classified in a single KNN call and combined by
+    ``summarize``. The HTTP service applies the same rule, so the page
+    shows the same answer with or without EMOVOICE_SERVICE_URL.
+    """
+    windows = clip_windows(source, window_seconds, hop_seconds, cache, extractor)
+    labels, proba = classify_proba(windows)
+    return summarize(labels, proba, threshold)
+
+
+def analyze_many(windows, threshold=DEPRESSION_THRESHOLD):
+    """``summarize`` results for several clips whose windows are classified in one KNN call."""
+    labels, proba = classify_proba(np.vstack(windows))
+    bounds = np.cumsum([len(w) for w in windows])[:-1]
+    return [summarize(labels, part, threshold) for part in np.split(proba, bounds)]
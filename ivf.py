@@ -0,0 +1,202 @@
+"""Inverted-file (IVF) index for approximate nearest-neighbour search.
+
+    python ivf.py --synthetic 200000 --n-probe 1 2 4 8 16
+    python ivf.py --model model/knn_model.joblib --n-lists 32 --n-probe 1 2 4
+
+The training rows are partitioned by k-means into ``n_lists`` cells. A
+query only scans the rows of its ``n_probe`` closest cells, so the work per
+query is roughly ``n_probe / n_lists`` of a brute-force scan. New rows are
+assigned to their closest existing cell; the centroids are not retrained.
+
+The CLI reports recall@k and label agreement against exact search together
+with the per-query latency of both, for each probe count.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from knn import KNearestNeighbors
+
+# Jumlah elemen maksimum per blok saat menghitung jarak ke centroid
+BLOCK_ELEMENTS = 4_000_000
+# Sampel per centroid untuk melatih k-means (sisanya hanya di-assign)
+SAMPLES_PER_LIST = 256
+
+
+def default_n_lists(n_samples):
+    # Aturan umum IVF: sekitar sqrt(n) sel
+    return max(1, int(round(np.sqrt(n_samples))))
+
+
+def _sq_distances(X, centroids):
+    # ||x - c||^2 lewat ekspansi perkalian titik; cukup untuk memilih sel
+    return (np.einsum("ij,ij->i", X, X)[:, None] - 2 * X @ centroids.T
+            + np.einsum("ij,ij->i", centroids, centroids)[None, :])
+
+
+def assign(X, centroids):
+    """Index of the closest centroid for every row, computed in blocks."""
+    X = np.asarray(X, dtype=np.float64)
+    out = np.empty(len(X), dtype=np.intp)
+    step = max(1, BLOCK_ELEMENTS // max(1, centroids.size))
+    for start in range(0, len(X), step):
+        out[start:start + step] = np.argmin(_sq_distances(X[start:start + step], centroids), axis=1)
+    return out
+
+
+def kmeans(X, n_clusters, n_iter=20, random_state=0):
+    """Lloyd's k-means on a random sample of at most ``SAMPLES_PER_LIST * n_clusters`` rows."""
+    rng = np.random.default_rng(random_state)
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) > SAMPLES_PER_LIST * n_clusters:
+        X = X[rng.choice(len(X), SAMPLES_PER_LIST * n_clusters, replace=False)]
+    centroids = X[rng.choice(len(X), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = assign(X, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.stack([np.bincount(labels, weights=col, minlength=n_clusters) for col in X.T], axis=1)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Sel kosong diisi ulang dengan titik acak agar semua sel terpakai
+        centroids[empty] = X[rng.choice(len(X), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, n_lists, n_iter=20, random_state=0):
+        self.n_lists = n_lists
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.centroids = None
+        self.lists = []
+
+    def fit(self, X):
+        n_lists = min(self.n_lists, len(X))
+        self.centroids = kmeans(X, n_lists, self.n_iter, self.random_state)
+        self.lists = [np.empty(0, dtype=np.intp) for _ in range(n_lists)]
+        self.add(X, start=0)
+        return self
+
+    def add(self, X, start):
+        """Append rows ``start .. start + len(X) - 1`` to their closest cells."""
+        cells = assign(X, self.centroids)
+        order = np.argsort(cells, kind="stable")
+        bounds = np.searchsorted(cells[order], np.arange(len(self.centroids) + 1))
+        for cell in np.flatnonzero(np.diff(bounds)):
+            rows = order[bounds[cell]:bounds[cell + 1]] + start
+            self.lists[cell] = np.concatenate([self.lists[cell], rows])
+
+    def probe(self, X, n_probe):
+        """Closest ``n_probe`` cells for every query, closest first."""
+        n_probe = min(n_probe, len(self.centroids))
+        d = _sq_distances(np.asarray(X, dtype=np.float64), self.centroids)
+        if n_probe < d.shape[1]:
+            cells = np.argpartition(d, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            cells = np.tile(np.arange(d.shape[1]), (len(d), 1))
+        return np.take_along_axis(cells, np.argsort(np.take_along_axis(d, cells, axis=1), axis=1), axis=1)
+
+    def candidates(self, cells, k):
+        """Sorted training rows in ``cells``; further cells are added until there are at least ``k``."""
+        idx = np.concatenate([self.lists[c] for c in cells])
+        if len(idx) < k:
+            extra = [c for c in range(len(self.lists)) if c not in set(cells)]
+            for cell in extra:
+                idx = np.concatenate([idx, self.lists[cell]])
+                if len(idx) >= k:
+                    break
+        return np.sort(idx)
+
+    def sizes(self):
+        return np.array([len(rows) for rows in self.lists])
+
+
+def evaluate(knn, X, n_probes, k=None):
+    """Recall@k and label agreement of IVF search against exact search, per probe count."""
+    k = k or knn.k
+    X = np.asarray(X)
+    exact = KNearestNeighbors(k=k, algorithm="brute")
+    exact.fit(knn.X_train, knn.y_train)
+    exact.classes_, exact.x_scale = knn.classes_, knn.x_scale
+
+    start = time.perf_counter()
+    exact_idx = exact.kneighbors(X)
+    exact_labels = exact.predict(X)
+    exact_ms = 1000 * (time.perf_counter() - start) / len(X)
+
+    saved_k, saved_probe = knn.k, knn.n_probe
+    report = {"n_queries": int(len(X)), "n_train": int(len(knn.X_train)), "k": int(k),
+              "n_lists": int(len(knn._ivf.centroids)), "exact_ms_per_query": exact_ms, "probes": []}
+    try:
+        knn.k = k
+        for n_probe in n_probes:
+            knn.n_probe = n_probe
+            start = time.perf_counter()
+            idx = knn.kneighbors(X)
+            labels = knn.predict(X)
+            ann_ms = 1000 * (time.perf_counter() - start) / len(X)
+            hits = [len(np.intersect1d(a, b)) for a, b in zip(idx, exact_idx)]
+            report["probes"].append({
+                "n_probe": int(n_probe),
+                f"recall@{k}": float(np.sum(hits) / exact_idx.size),
+                "label_agreement": float(np.mean(labels == exact_labels)),
+                "ms_per_query": ann_ms,
+                "speedup": exact_ms / ann_ms if ann_ms else float("inf"),
+            })
+    finally:
+        knn.k, knn.n_probe = saved_k, saved_probe
+    return report
+
+
+def synthetic(n_samples, n_features=39, n_classes=7, n_clusters=200, random_state=0):
+    # Campuran Gaussian dengan label per klaster, mirip fitur MFCC yang distandardisasi
+    rng = np.random.default_rng(random_state)
+    centers = rng.normal(scale=2.0, size=(n_clusters, n_features))
+    cluster = rng.integers(n_clusters, size=n_samples)
+    X = centers[cluster] + rng.normal(size=(n_samples, n_features))
+    labels = np.array([f"class{i}" for i in range(n_classes)], dtype=object)
+    return X, labels[cluster % n_classes]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an IVF KNN index and compare it with exact search")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--model", help="KNN artifact whose training rows are indexed")
+    source.add_argument("--synthetic", type=int, metavar="N", help="index N synthetic 39-d rows")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--n-lists", type=int, default=None, help="default: sqrt(n_train)")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("-k", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(1)
+    if args.model:
+        from model_registry import load_artifact
+
+        base = load_artifact(args.model)
+        X_train, y_train = base._train_matrix(), base.y_train
+        k = args.k or base.k
+        # Kueri: baris latih dengan sedikit derau, agar tidak identik dengan datanya
+        X_query = X_train[rng.choice(len(X_train), args.queries)] + rng.normal(scale=0.3, size=(args.queries, X_train.shape[1]))
+        classes = base.classes_
+    else:
+        X_all, y_all = synthetic(args.synthetic + args.queries)
+        X_train, y_train = X_all[:args.synthetic], y_all[:args.synthetic]
+        X_query = X_all[args.synthetic:]
+        k = args.k or 5
+        classes = None
+
+    start = time.perf_counter()
+    knn = KNearestNeighbors(k=k, algorithm="ivf", n_lists=args.n_lists)
+    knn.classes_ = classes
+    knn.fit(X_train, y_train)
+    build_seconds = time.perf_counter() - start
+    report = evaluate(knn, X_query, args.n_probe, k)
+    report["build_seconds"] = build_seconds
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
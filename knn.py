@@ -0,0 +1,317 @@
+import numpy as np
+from collections import Counter
+from scipy.spatial import cKDTree
+
+# Jumlah elemen maksimum untuk satu blok selisih (query x data latih x fitur)
+# agar pemakaian memori tetap kecil saat memproses batch besar
+BLOCK_ELEMENTS = 4_000_000
+# Di atas ukuran ini mode 'auto' akan membangun indeks KD-tree
+AUTO_TREE_MIN_SAMPLES = 20_000
+
+
+METRICS = ("euclidean", "manhattan", "cosine")
+
+
+def euclidean_distance(x1, x2):
+    return np.sqrt(np.sum((x1 - x2) ** 2))
+
+
+def manhattan_distance(x1, x2):
+    return np.sum(np.abs(x1 - x2))
+
+
+def cosine_distance(x1, x2):
+    return 1 - np.dot(x1, x2) / (np.linalg.norm(x1) * np.linalg.norm(x2))
+
+
+def _unit(X):
+    norms = np.linalg.norm(X, axis=-1, keepdims=True)
+    return X / np.where(norms == 0, 1, norms)
+
+
+def pairwise_distances(X, X_train, metric="euclidean"):
+    """Distance matrix of shape (len(X), len(X_train)).
+
+    Euclidean and Manhattan rows are computed from explicit differences
+    (not the dot-product expansion) so every euclidean value is
+    bit-identical to ``euclidean_distance``.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    X = np.asarray(X)
+    X_train = np.asarray(X_train)
+    if metric == "cosine":
+        return 1 - _unit(X) @ _unit(X_train).T
+    distances = np.empty((X.shape[0], X_train.shape[0]))
+    step = max(1, BLOCK_ELEMENTS // max(1, X_train.size))
+    for start in range(0, X.shape[0], step):
+        diff = X[start:start + step, None, :] - X_train[None, :, :]
+        if metric == "euclidean":
+            distances[start:start + step] = np.sqrt(np.sum(diff ** 2, axis=-1))
+        else:
+            distances[start:start + step] = np.sum(np.abs(diff), axis=-1)
+    return distances
+
+
+def _distances_to(rows, x, metric="euclidean"):
+    # Jarak dari x ke setiap baris kandidat (broadcast pada sumbu terakhir)
+    if metric == "euclidean":
+        return np.sqrt(np.sum((rows - x) ** 2, axis=-1))
+    if metric == "manhattan":
+        return np.sum(np.abs(rows - x), axis=-1)
+    return 1 - np.sum(_unit(rows) * _unit(x), axis=-1)
+
+
+def _nearest(distances, k, candidates=None):
+    # Ambil k tetangga terdekat; jarak yang sama diurutkan berdasarkan indeks
+    # data latih sehingga hasilnya sama dengan np.argsort(kind='stable')
+    if candidates is None:
+        candidates = np.arange(distances.shape[0])
+    if k < distances.shape[0]:
+        kth = np.partition(distances, k - 1)[k - 1]
+        mask = distances <= kth
+        distances = distances[mask]
+        candidates = candidates[mask]
+    order = np.lexsort((candidates, distances))[:k]
+    return candidates[order]
+
+
+def _vote(labels):
+    # Voting mayoritas; jika seri, label yang muncul lebih dulu yang menang
+    return Counter(labels).most_common(1)[0][0]
+
+
+def inverse_distance_weights(distances, eps=1e-10):
+    # Bobot voting seperti ImprovedKNearestNeighbors di notebook: 1 / (d + eps)
+    return 1.0 / (np.asarray(distances) + eps)
+
+
+ALGORITHMS = ("auto", "brute", "kd_tree", "ivf")
+# Jumlah sel IVF terdekat yang diperiksa per kueri (mode 'ivf', pencarian aproksimasi)
+DEFAULT_N_PROBE = 8
+
+
+class KNearestNeighbors:
+    def __init__(self, k=3, algorithm="auto", leaf_size=40, n_lists=None, n_probe=DEFAULT_N_PROBE,
+                 metric="euclidean"):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        if metric != "euclidean" and algorithm in ("kd_tree", "ivf"):
+            raise ValueError(f"algorithm={algorithm!r} only supports the euclidean metric")
+        self.k = k
+        self.metric = metric
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        # Mode 'ivf': n_lists sel k-means (default sqrt(n)), n_probe sel diperiksa per kueri
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        # Diisi oleh format model ringkas: label berupa kode integer + tabel
+        # label, dan (opsional) X_train int8 dengan skala per fitur
+        self.classes_ = None
+        self.x_scale = None
+        self._tree = None
+        self._ivf = None
+
+    def __setstate__(self, state):
+        # Model lama (joblib) hanya menyimpan k, X_train dan y_train
+        self.__dict__.update(state)
+        self.__dict__.setdefault("algorithm", "brute")
+        self.__dict__.setdefault("metric", "euclidean")
+        self.__dict__.setdefault("leaf_size", 40)
+        self.__dict__.setdefault("classes_", None)
+        self.__dict__.setdefault("x_scale", None)
+        self.__dict__.setdefault("_tree", None)
+        self.__dict__.setdefault("n_lists", None)
+        self.__dict__.setdefault("n_probe", DEFAULT_N_PROBE)
+        self.__dict__.setdefault("_ivf", None)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tree"] = None
+        return state
+
+    def fit(self, X, y):
+        self.X_train = X
+        self.y_train = y
+        self._tree = None
+        self._ivf = None
+        if self.algorithm == "ivf":
+            self._build_ivf()
+        elif self._use_tree():
+            self._build_tree()
+        return self
+
+    def add(self, X, y):
+        """Append labelled rows without rebuilding the search index.
+
+        In 'ivf' mode the new rows join their closest existing cell; a
+        KD-tree is rebuilt lazily on the next query. Returns self.
+        """
+        X = np.atleast_2d(np.asarray(X))
+        y = np.asarray(y, dtype=object).ravel()
+        if len(X) != len(y):
+            raise ValueError(f"X has {len(X)} rows but y has {len(y)} labels")
+        start = len(self.X_train)
+        if self.classes_ is not None:
+            # Model ringkas: label baru ditambahkan ke tabel, y_train tetap berupa kode
+            classes = list(self.classes_)
+            for label in y:
+                if label not in classes:
+                    classes.append(label)
+            self.classes_ = np.array(classes, dtype=object)
+            y = np.array([classes.index(label) for label in y], dtype=np.asarray(self.y_train).dtype)
+        if self.x_scale is not None:
+            X_stored = np.clip(np.rint(X / self.x_scale), -127, 127).astype(np.int8)
+        else:
+            X_stored = X.astype(np.asarray(self.X_train).dtype)
+        self.X_train = np.concatenate([np.asarray(self.X_train), X_stored])
+        self.y_train = np.concatenate([np.asarray(self.y_train), y])
+        self._tree = None
+        if self._ivf is not None:
+            self._ivf.add(self._train_rows(slice(start, None)), start)
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=self._dtype())
+        if X.ndim == 1:
+            X = X[None, :]
+        neighbours = self._kneighbors(X)
+        predictions = [_vote([self.y_train[i] for i in row]) for row in neighbours]
+        if self.classes_ is not None:
+            return np.asarray(self.classes_)[np.array(predictions, dtype=np.intp)]
+        return np.array(predictions)
+
+    def kneighbors(self, X, return_distance=False):
+        """Indices of the k nearest training rows for each query, closest first.
+
+        With ``return_distance=True`` returns ``(distances, indices)``.
+        """
+        X = np.asarray(X, dtype=self._dtype())
+        if X.ndim == 1:
+            X = X[None, :]
+        indices = np.array(self._kneighbors(X))
+        if not return_distance:
+            return indices
+        distances = _distances_to(self._train_rows(indices), X[:, None, :], self.metric)
+        return distances, indices
+
+    def labels(self):
+        """Class labels in the column order used by ``predict_proba``."""
+        if self.classes_ is not None:
+            return np.asarray(self.classes_)
+        return np.unique(np.asarray(self.y_train))
+
+    def predict_proba(self, X, weights="distance"):
+        """Per-class probabilities from the k neighbours of each query.
+
+        ``weights="distance"`` weighs every neighbour by its inverse
+        distance; ``"uniform"`` gives the plain vote fractions. Columns
+        follow ``labels()``.
+        """
+        if weights not in ("distance", "uniform"):
+            raise ValueError(f"Unknown weights: {weights}")
+        distances, indices = self.kneighbors(X, return_distance=True)
+        labels = self.labels()
+        neighbour_labels = np.asarray(self.y_train)[indices]
+        if self.classes_ is not None:
+            codes = neighbour_labels.astype(np.intp)
+        else:
+            codes = np.searchsorted(labels, neighbour_labels)
+        w = inverse_distance_weights(distances) if weights == "distance" else np.ones(distances.shape)
+        proba = np.zeros((len(indices), len(labels)))
+        np.add.at(proba, (np.arange(len(indices))[:, None], codes), w)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def _predict(self, x):
+        return self.predict([x])[0]
+
+    def _kneighbors(self, X):
+        if self.algorithm == "ivf":
+            return self._kneighbors_ivf(X)
+        if self._use_tree():
+            return self._kneighbors_tree(X)
+        return self._kneighbors_brute(X)
+
+    def _use_tree(self):
+        if self.algorithm == "kd_tree":
+            return True
+        if self.algorithm == "auto":
+            return self.metric == "euclidean" and len(self.X_train) >= AUTO_TREE_MIN_SAMPLES
+        return False
+
+    def _dtype(self):
+        return np.float32 if self.x_scale is not None else np.asarray(self.X_train).dtype
+
+    def _train_matrix(self):
+        """The whole training matrix as floats (a full copy for int8 models; not for the query path)."""
+        return self._train_rows(slice(None))
+
+    def _train_rows(self, idx):
+        # Dekuantisasi int8 -> float32 hanya untuk baris yang dibutuhkan; array
+        # int8 aslinya tetap dibagi antar proses via mmap
+        rows = self.X_train[idx]
+        if self.x_scale is not None:
+            return np.asarray(rows).astype(np.float32) * self.x_scale
+        return np.asarray(rows)
+
+    def _distances(self, X):
+        # Matriks jarak kueri x seluruh data latih; model int8 didekuantisasi per blok baris
+        if self.x_scale is None:
+            return pairwise_distances(X, self.X_train, self.metric)
+        n_train = len(self.X_train)
+        distances = np.empty((len(X), n_train))
+        step = max(1, BLOCK_ELEMENTS // max(1, X.size))
+        for start in range(0, n_train, step):
+            rows = self._train_rows(slice(start, start + step))
+            distances[:, start:start + step] = pairwise_distances(X, rows, self.metric)
+        return distances
+
+    def _build_tree(self):
+        self._tree = cKDTree(self._train_matrix(), leafsize=self.leaf_size)
+
+    def _build_ivf(self):
+        from ivf import IVFIndex, default_n_lists
+
+        X_train = self._train_matrix()
+        self._ivf = IVFIndex(self.n_lists or default_n_lists(len(X_train))).fit(X_train)
+
+    def _kneighbors_brute(self, X):
+        n_train = len(self.X_train)
+        k = min(self.k, n_train)
+        neighbours = []
+        step = max(1, BLOCK_ELEMENTS // max(1, n_train * X.shape[1]))
+        for start in range(0, X.shape[0], step):
+            block = self._distances(X[start:start + step])
+            neighbours.extend(_nearest(row, k) for row in block)
+        return neighbours
+
+    def _kneighbors_tree(self, X):
+        if self._tree is None:
+            self._build_tree()
+        k = min(self.k, len(self.X_train))
+        # Tree hanya dipakai untuk mencari kandidat; jarak akhirnya dihitung
+        # ulang dengan rumus yang sama seperti mode brute agar hasilnya identik
+        radius, _ = self._tree.query(X, k=k)
+        radius = np.asarray(radius).reshape(len(X), -1)[:, -1]
+        candidates = self._tree.query_ball_point(X, radius * (1 + 1e-9) + 1e-12)
+        neighbours = []
+        for x, idx in zip(X, candidates):
+            idx = np.asarray(sorted(idx), dtype=np.intp)
+            distances = np.sqrt(np.sum((self._train_rows(idx) - x) ** 2, axis=-1))
+            neighbours.append(_nearest(distances, k, idx))
+        return neighbours
+
+    def _kneighbors_ivf(self, X):
+        if self._ivf is None:
+            self._build_ivf()
+        k = min(self.k, len(self.X_train))
+        # Hanya baris di n_probe sel terdekat yang dihitung jaraknya (aproksimasi);
+        # pemilihan k terdekat di antara kandidat sama dengan mode brute
+        neighbours = []
+        for x, cells in zip(X, self._ivf.probe(X, self.n_probe)):
+            idx = self._ivf.candidates(cells, k)
+            distances = np.sqrt(np.sum((self._train_rows(idx) - x) ** 2, axis=-1))
+            neighbours.append(_nearest(distances, k, idx))
+        return neighbours
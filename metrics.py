@@ -0,0 +1,253 @@
+"""Lightweight stage timing, counters and export for the inference flow.
+
+    EMOVOICE_METRICS=1                    record timings and counters
+    EMOVOICE_METRICS_PORT=9108            serve Prometheus text on :9108/metrics
+    EMOVOICE_METRICS_LOG_INTERVAL=60      log a JSON snapshot every 60 s
+
+Stages are timed with ``with metrics.stage("features"): ...``. While
+disabled, ``stage()`` hands back one shared no-op context manager and
+``inc()``/``observe()`` return immediately, so the instrumented code costs
+a method call and an attribute check per stage.
+
+A ``metrics.request("submit")`` block counts the request, records errors
+by exception type and collects the stages run inside it as a trace.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED_ENV = "EMOVOICE_METRICS"
+PORT_ENV = "EMOVOICE_METRICS_PORT"
+LOG_INTERVAL_ENV = "EMOVOICE_METRICS_LOG_INTERVAL"
+PREFIX = "emovoice_"
+# Batas bucket histogram dalam detik (konvensi Prometheus)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("emovoice.metrics")
+_NULL = nullcontext()
+_current_trace = contextvars.ContextVar("emovoice_trace", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # Bucket pertama dengan batas >= value (le); sisanya masuk +Inf
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else 0.0}
+
+
+class Trace:
+    """Stages run during one request, in order: ``[(stage, seconds), ...]``."""
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.error = None
+
+    def as_dict(self):
+        return {"request": self.name, "error": self.error,
+                "spans": [{"stage": stage, "ms": round(1000 * seconds, 3)} for stage, seconds in self.spans]}
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.metrics.observe("stage_duration_seconds", elapsed, stage=self.name)
+        if exc_type is not None:
+            self.metrics.inc("errors_total", stage=self.name, type=exc_type.__name__)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((self.name, elapsed))
+        return False
+
+
+class _Request:
+    __slots__ = ("metrics", "trace", "token", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.trace = Trace(name)
+
+    def __enter__(self):
+        self.metrics.inc("requests_total", endpoint=self.trace.name)
+        self.token = _current_trace.set(self.trace)
+        self.start = time.perf_counter()
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _current_trace.reset(self.token)
+        self.metrics.observe("request_duration_seconds", elapsed, endpoint=self.trace.name)
+        if exc_type is not None:
+            self.trace.error = exc_type.__name__
+            self.metrics.inc("request_errors_total", endpoint=self.trace.name, type=exc_type.__name__)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({**self.trace.as_dict(), "total_ms": round(1000 * elapsed, 3)}))
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def stage(self, name):
+        """Context manager timing one stage; a shared no-op when disabled."""
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, name)
+
+    def request(self, name):
+        """Context manager for one request; yields its ``Trace`` (or None when disabled)."""
+        if not self.enabled:
+            return _NULL
+        return _Request(self, name)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "histograms": [{"name": name, "labels": dict(labels), **h.snapshot()}
+                               for (name, labels), h in sorted(self.histograms.items())],
+            }
+
+    def prometheus(self):
+        """All counters and histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count)) for key, h in self.histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics(enabled=os.environ.get(ENABLED_ENV, "") == "1")
+
+
+def serve_prometheus(port, host="0.0.0.0", registry=metrics):
+    """Serve ``registry.prometheus()`` on ``http://host:port/metrics`` from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="emovoice-metrics-http", daemon=True).start()
+    return server
+
+
+def log_periodically(interval, registry=metrics):
+    """Log a JSON snapshot of ``registry`` every ``interval`` seconds from a daemon thread."""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            logger.info(json.dumps(registry.snapshot()))
+
+    threading.Thread(target=run, name="emovoice-metrics-log", daemon=True).start()
+    return stop
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_from_env():
+    """Start the exporters requested by the environment, once per process."""
+    global _configured
+    with _configure_lock:
+        if _configured or not metrics.enabled:
+            return
+        _configured = True
+        if os.environ.get(PORT_ENV):
+            serve_prometheus(int(os.environ[PORT_ENV]))
+        if os.environ.get(LOG_INTERVAL_ENV):
+            log_periodically(float(os.environ[LOG_INTERVAL_ENV]))
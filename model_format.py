@@ -0,0 +1,159 @@
+"""Compact, memory-mappable KNN model artifact.
+
+    python model_format.py convert model/knn_model.joblib model/knn_compact --dtype int8 --evaluate
+
+An artifact is a directory holding:
+
+    meta.json     format version, k, metric, dtype, feature count and the label table
+    X_train.npy   training features, float32 or int8 (C-contiguous)
+    y_codes.npy   integer label codes indexing meta["labels"]
+    x_scale.npy   per-feature dequantization scale (int8 only)
+
+The arrays are opened with ``np.load(mmap_mode="r")``, so every process
+that loads the same artifact shares one copy in the OS page cache instead
+of unpickling its own.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from knn import KNearestNeighbors, pairwise_distances
+
+FORMAT_VERSION = 1
+DTYPES = ("float32", "int8")
+
+
+def quantize_int8(X):
+    # Kuantisasi simetris per fitur: x ~= q * scale, q di [-127, 127]
+    scale = np.abs(X).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.rint(X / scale), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+def _save(path, name, array):
+    # Tulis ke nama sementara lalu os.replace: proses yang masih me-mmap file
+    # lama tetap memegang inode lama (menimpa di tempat memicu SIGBUS)
+    target = os.path.join(path, name)
+    with open(target + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(target + ".tmp", target)
+
+
+def export_compact(knn, path, dtype="float32"):
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+    X = np.asarray(knn._train_matrix(), dtype=np.float64)
+    labels = knn.y_train if knn.classes_ is None else np.asarray(knn.classes_)[np.asarray(knn.y_train)]
+    # Urutan label mengikuti kemunculan pertama agar kode stabil dan mudah dibaca
+    table = list(dict.fromkeys(str(label) for label in labels))
+    codes = np.array([table.index(str(label)) for label in labels],
+                     dtype=np.int8 if len(table) < 128 else np.int32)
+
+    os.makedirs(path, exist_ok=True)
+    if dtype == "int8":
+        q, scale = quantize_int8(X)
+        _save(path, "X_train.npy", np.ascontiguousarray(q))
+        _save(path, "x_scale.npy", scale)
+    else:
+        _save(path, "X_train.npy", np.ascontiguousarray(X, dtype=np.float32))
+        if os.path.exists(os.path.join(path, "x_scale.npy")):
+            os.remove(os.path.join(path, "x_scale.npy"))
+    _save(path, "y_codes.npy", codes)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "k": int(knn.k),
+        "metric": knn.metric,
+        "dtype": dtype,
+        "n_samples": int(X.shape[0]),
+        "n_features": int(X.shape[1]),
+        "labels": table,
+    }
+    # meta.json ditulis terakhir: artefak baru dianggap lengkap setelah file ini ada
+    with open(os.path.join(path, "meta.json.tmp"), "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+    return meta
+
+
+def is_compact(path):
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def load_compact(path, algorithm="brute"):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format: {meta.get('format_version')}")
+    metric = meta.get("metric", "euclidean")
+    knn = KNearestNeighbors(k=meta["k"], algorithm=algorithm if metric == "euclidean" else "brute", metric=metric)
+    X = np.load(os.path.join(path, "X_train.npy"), mmap_mode="r")
+    codes = np.load(os.path.join(path, "y_codes.npy"), mmap_mode="r")
+    if X.shape != (meta["n_samples"], meta["n_features"]) or len(codes) != meta["n_samples"]:
+        raise ValueError(f"Compact model arrays in {path} do not match meta.json")
+    knn.fit(X, codes)
+    knn.classes_ = np.array(meta["labels"], dtype=object)
+    if meta["dtype"] == "int8":
+        knn.x_scale = np.load(os.path.join(path, "x_scale.npy"))
+    return knn
+
+
+def holdout(knn, X_scaled, y, tol=1e-3):
+    """Rows of the dataset that are not in the model's training matrix (the notebook's test split)."""
+    nearest = pairwise_distances(X_scaled, knn._train_matrix()).min(axis=1)
+    mask = nearest > tol
+    return X_scaled[mask], y[mask]
+
+
+def evaluate(baseline, candidates, data_dir):
+    """Hold-out accuracy of the float64 baseline and of each compact candidate."""
+    from feature_cache import FeatureCache
+    from model_registry import get_model
+    from train import discover_dataset
+
+    data = discover_dataset(data_dir)
+    X = FeatureCache().extract_many([p for p, _ in data])
+    y = np.array([label for _, label in data], dtype=object)
+    _, scaler = get_model()
+    X_test, y_test = holdout(baseline, scaler.transform(X), y)
+    base_pred = baseline.predict(X_test)
+    report = {"n_test": int(len(y_test)), "baseline_accuracy": float(np.mean(base_pred == y_test))}
+    for name, model in candidates.items():
+        pred = model.predict(X_test)
+        accuracy = float(np.mean(pred == y_test))
+        report[name] = {
+            "accuracy": accuracy,
+            "accuracy_delta": accuracy - report["baseline_accuracy"],
+            "agreement_with_baseline": float(np.mean(pred == base_pred)),
+        }
+    return report
+
+
+def main(argv=None):
+    from model_registry import load_artifact
+    from train import DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Convert and evaluate compact KNN model artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="convert a joblib KNN model to the compact format")
+    convert.add_argument("source", help="e.g. model/knn_model.joblib")
+    convert.add_argument("dest", help="output directory, e.g. model/knn_compact")
+    convert.add_argument("--dtype", choices=DTYPES, default="float32")
+    convert.add_argument("--evaluate", action="store_true", help="report hold-out accuracy delta vs the float64 model")
+    convert.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+
+    baseline = load_artifact(args.source)
+    meta = export_compact(baseline, args.dest, dtype=args.dtype)
+    size = sum(os.path.getsize(os.path.join(args.dest, f)) for f in os.listdir(args.dest))
+    print(f"wrote {args.dest} ({meta['dtype']}, {meta['n_samples']}x{meta['n_features']}, {size} bytes; "
+          f"source {os.path.getsize(args.source)} bytes)")
+    if args.evaluate:
+        report = evaluate(baseline, {args.dtype: load_compact(args.dest)}, args.data_dir)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import joblib
+from sklearn.pipeline import Pipeline
+
+from features import MANIFEST_PATH, default_extractor
+from metrics import metrics
+from knn import KNearestNeighbors
+from model_format import is_compact, load_compact
+
+# Bisa juga menunjuk ke direktori model ringkas, mis. "model/knn_compact"
+MODEL_PATH = os.environ.get("EMOVOICE_MODEL_PATH", "model/knn_model.joblib")
+SCALER_PATH = "model/scaler.joblib"
+# Opsional: PCA yang diterapkan setelah scaler (ditulis oleh tune.py)
+PCA_PATH = "model/pca.joblib"
+
+
+def _artifact_files(path):
+    # Artefak ringkas (model_format) berupa direktori berisi beberapa file
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    return [path]
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    for name in _artifact_files(path):
+        digest.update(os.path.basename(name).encode())
+        with open(name, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_stamp(path):
+    stats = [os.stat(name) for name in _artifact_files(path)]
+    return max(s.st_mtime_ns for s in stats), sum(s.st_size for s in stats)
+
+
+def load_artifact(path):
+    # knn_model.joblib dipickle dari notebook, jadi kelasnya tercatat sebagai
+    # __main__.KNearestNeighbors; pastikan nama itu ada di luar Streamlit juga
+    if is_compact(path):
+        return load_compact(path)
+    main = sys.modules.get("__main__")
+    if main is not None and not hasattr(main, "KNearestNeighbors"):
+        main.KNearestNeighbors = KNearestNeighbors
+    return joblib.load(path)
+
+
+class _Entry:
+    def __init__(self, path, optional=False):
+        self.path = path
+        self.optional = optional
+        self.stamp = None
+        self.digest = None
+        self.value = None
+
+
+class ModelRegistry:
+    """Keeps the KNN model and scaler in memory for the whole process.
+
+    Every ``get()`` only stats the artifact files. A changed mtime/size
+    triggers a content hash, and the artifacts are unpickled again only
+    when that hash differs from the one currently loaded.
+
+    When ``pca_path`` exists, the scaler returned by ``get()`` is a
+    ``Pipeline`` of scaler and PCA, so callers keep calling
+    ``scaler.transform``.
+
+    When ``manifest_path`` exists, the extractor params recorded in it
+    must match ``extractor_params``; a model trained with other feature
+    settings is refused instead of being fed mismatched vectors.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH, n_features=None, pca_path=PCA_PATH,
+                 manifest_path=MANIFEST_PATH, extractor_params=None):
+        self.model = _Entry(model_path)
+        self.scaler = _Entry(scaler_path)
+        self.pca = _Entry(pca_path, optional=True)
+        self.manifest = _Entry(manifest_path, optional=True)
+        self.transform = None
+        self.n_features = n_features
+        self.extractor_params = extractor_params
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            changed = [entry for entry in (self.model, self.scaler, self.pca, self.manifest)
+                       if self._changed(entry)]
+            if not changed:
+                self.hits += 1
+                metrics.inc("cache_hits_total", cache="model")
+                return self.model.value, self.transform
+            self.misses += 1
+            metrics.inc("cache_misses_total", cache="model")
+            with metrics.stage("model_load"):
+                self._load(changed)
+            return self.model.value, self.transform
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "last_load_seconds": self.last_load_seconds,
+            "total_load_seconds": self.total_load_seconds,
+            "model_sha256": self.model.digest,
+            "scaler_sha256": self.scaler.digest,
+            "pca_sha256": self.pca.digest,
+            "manifest_sha256": self.manifest.digest,
+        }
+
+    def _changed(self, entry):
+        if entry.optional and not os.path.exists(entry.path):
+            # Artefak opsional tidak ada; berubah hanya jika sebelumnya ada
+            removed = entry.digest is not None
+            entry.stamp = entry.digest = None
+            return removed
+        stamp = file_stamp(entry.path)
+        if entry.value is not None and stamp == entry.stamp:
+            return False
+        digest = file_digest(entry.path)
+        if entry.value is not None and digest == entry.digest:
+            # Hanya di-touch; isinya sama, tidak perlu unpickle ulang
+            entry.stamp = stamp
+            return False
+        entry.stamp = stamp
+        entry.digest = digest
+        return True
+
+    def _load(self, entries):
+        start = time.perf_counter()
+        values = {entry: self._read(entry) for entry in entries}
+        model = values.get(self.model, self.model.value)
+        scaler = values.get(self.scaler, self.scaler.value)
+        pca = values.get(self.pca, self.pca.value)
+        manifest = values.get(self.manifest, self.manifest.value)
+        try:
+            self._validate(model, scaler, pca, manifest)
+        except ValueError:
+            # Jangan simpan pasangan yang tidak cocok; coba lagi di get() berikutnya
+            for entry in entries:
+                entry.stamp = entry.digest = None
+            raise
+        for entry in entries:
+            entry.value = values[entry]
+        self.transform = scaler if pca is None else Pipeline([("scaler", scaler), ("pca", pca)])
+        self.loads += 1
+        self.last_load_seconds = time.perf_counter() - start
+        self.total_load_seconds += self.last_load_seconds
+
+    def _read(self, entry):
+        if entry.optional and not os.path.exists(entry.path):
+            return None
+        if entry is self.manifest:
+            with open(entry.path) as f:
+                return json.load(f)
+        return load_artifact(entry.path)
+
+    def _validate(self, model, scaler, pca=None, manifest=None):
+        model_dim = model.X_train.shape[1]
+        scaler_dim = getattr(scaler, "n_features_in_", None)
+        if pca is not None:
+            if model_dim != pca.n_components_:
+                raise ValueError(
+                    f"Model expects {model_dim} features but PCA produces {pca.n_components_}"
+                )
+            if scaler_dim is not None and pca.n_features_in_ != scaler_dim:
+                raise ValueError(
+                    f"PCA was fitted on {pca.n_features_in_} features but scaler on {scaler_dim}"
+                )
+            input_dim = pca.n_features_in_
+        else:
+            input_dim = model_dim
+            if scaler_dim is not None and model_dim != scaler_dim:
+                raise ValueError(
+                    f"Model expects {model_dim} features but scaler was fitted on {scaler_dim}"
+                )
+        if manifest is not None and self.extractor_params is not None:
+            # Manifest lama belum mencatat semua parameter; bandingkan yang ada saja
+            trained = manifest.get("features", {})
+            current = json.loads(json.dumps(self.extractor_params))
+            diff = [name for name in trained if name in current and trained[name] != current[name]]
+            if diff:
+                detail = ", ".join(f"{name}={trained[name]!r} (extractor: {current[name]!r})" for name in diff)
+                raise ValueError(
+                    f"Model was trained with {detail}; restart the app so the extractor takes its "
+                    f"settings from {self.manifest.path}, or unset the EMOVOICE_* override"
+                )
+        if self.n_features is not None and input_dim != self.n_features:
+            raise ValueError(
+                f"Model expects {input_dim} features but the extractor produces {self.n_features} "
+                f"(promote the model with train.py or tune.py so {self.manifest.path} records its feature blocks)"
+            )
+
+
+registry = ModelRegistry(n_features=default_extractor.n_features,
+                         extractor_params=default_extractor.params())
+
+
+def get_model():
+    return registry.get()
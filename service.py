@@ -0,0 +1,296 @@
+"""Standalone HTTP inference service with micro-batched KNN prediction.
+
+    python service.py --port 8502 --workers 4 --max-batch 32 --max-wait-ms 10 --read-timeout 30
+
+    POST /predict   body: raw audio bytes (WAV/MP3/...)  -> analyze_clip() result
+                    (emotion, depression, depression_score, confidence, ...)
+    GET  /health    liveness plus queue depth
+    GET  /metrics   request counters, batch sizes and model registry stats
+                    (?format=prometheus: stage histograms and counters from metrics.py)
+
+Decoding and window feature extraction run in a process pool. The window
+rows of each request wait in a bounded queue, and all windows of a
+micro-batch (up to --max-batch requests, or whatever arrived within
+--max-wait-ms) get their probabilities from one KNN predict_proba call.
+Each request is then scored with the same rule as the local path
+(``inference.summarize``). When more than --max-pending requests are in
+flight the service answers 503 instead of queueing without limit. A
+client that has not sent its whole request within --read-timeout seconds
+gets 408.
+
+The Streamlit page uses this service through predict_remote() when
+EMOVOICE_SERVICE_URL is set.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from inference import analyze_many, clip_windows
+from metrics import metrics
+from model_registry import get_model, registry
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+SERVICE_URL_ENV = "EMOVOICE_SERVICE_URL"
+# Batas waktu membaca header + body satu request (klien lambat/menggantung -> 408)
+READ_TIMEOUT = 30.0
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+logger = logging.getLogger("emovoice.service")
+
+
+class BadAudio(ValueError):
+    """The request body could not be decoded into analysis windows (answered with 400)."""
+
+
+class MicroBatcher:
+    """Collects the window rows of requests and analyzes them in batches."""
+
+    def __init__(self, max_batch=32, max_wait=0.01, max_queue=256):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.batches = 0
+        self.batched_items = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, windows):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((windows, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            self.batched_items += len(batch)
+            try:
+                # Satu panggilan predict_proba untuk seluruh batch, di thread agar loop tetap responsif
+                results = await loop.run_in_executor(None, analyze_many, [windows for windows, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class InferenceService:
+    def __init__(self, workers=None, max_batch=32, max_wait_ms=10.0, max_pending=256, read_timeout=READ_TIMEOUT):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.batcher = MicroBatcher(max_batch, max_wait_ms / 1000.0, max_pending)
+        self.max_pending = max_pending
+        self.read_timeout = read_timeout
+        self.pending = 0
+        self.counters = {"requests": 0, "ok": 0, "rejected": 0, "errors": 0, "timeouts": 0}
+        self.started = time.time()
+
+    async def predict(self, body):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        with metrics.stage("features"):
+            try:
+                windows = await loop.run_in_executor(self.pool, clip_windows, body)
+            except BrokenExecutor:
+                raise
+            except Exception as e:
+                # Gagal decode/ekstraksi = kesalahan input klien
+                raise BadAudio(f"{type(e).__name__}: {e}") from e
+        extracted = time.perf_counter()
+        with metrics.stage("batch_predict"):
+            result = await self.batcher.submit(windows)
+        done = time.perf_counter()
+        return {
+            **result,
+            "extract_ms": 1000 * (extracted - start),
+            "classify_ms": 1000 * (done - extracted),
+        }
+
+    def metrics(self):
+        batches = self.batcher.batches
+        return {
+            **self.counters,
+            "pending": self.pending,
+            "queue_depth": self.batcher.queue.qsize(),
+            "batches": batches,
+            "mean_batch_size": self.batcher.batched_items / batches if batches else 0.0,
+            "uptime_seconds": time.time() - self.started,
+            "model": registry.stats(),
+        }
+
+    async def handle(self, method, path, body, query=""):
+        if path == "/health":
+            return 200, {"status": "ok", "pending": self.pending, "queue_depth": self.batcher.queue.qsize()}
+        if path == "/metrics":
+            if "format=prometheus" in query:
+                return 200, metrics.prometheus()
+            return 200, self.metrics()
+        if path != "/predict":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        self.counters["requests"] += 1
+        if not body:
+            return 400, {"error": "empty body"}
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            return 503, {"error": "server busy, retry later"}
+        self.pending += 1
+        try:
+            with metrics.request("predict"):
+                result = await self.predict(body)
+        except BadAudio as e:
+            self.counters["errors"] += 1
+            return 400, {"error": str(e)}
+        except Exception as e:
+            # Kesalahan di sisi server (model registry, batcher, pool) -> 500
+            self.counters["errors"] += 1
+            logger.exception("predict failed")
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.pending -= 1
+        self.counters["ok"] += 1
+        return 200, result
+
+    async def serve_client(self, reader, writer):
+        try:
+            status, payload = await self._read_and_handle(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            logger.exception("request handling failed")
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        headers = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read_and_handle(self, reader):
+        # pending baru dihitung di handle(), jadi pembacaan harus dibatasi waktu
+        # agar koneksi yang tidak pernah selesai mengirim tidak menumpuk
+        try:
+            error, request = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            return 408, {"error": f"request not received within {self.read_timeout:g} s"}
+        if error is not None:
+            return error, request
+        method, target, body = request
+        path, _, query = target.partition("?")
+        return await self.handle(method.upper(), path, body, query)
+
+    async def _read_request(self, reader):
+        """``(None, (method, target, body))``, or ``(status, payload)`` for a malformed request."""
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            return 400, {"error": "bad request line"}
+        method, target, _ = parts
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            return 400, {"error": "invalid Content-Length"}
+        if length < 0:
+            return 400, {"error": "invalid Content-Length"}
+        if length > MAX_BODY_BYTES:
+            return 413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"}
+        body = await reader.readexactly(length) if length else b""
+        return None, (method, target, body)
+
+
+async def serve(host="127.0.0.1", port=8502, **kwargs):
+    service = InferenceService(**kwargs)
+    metrics.enable()  # /metrics selalu tersedia di service
+    get_model()  # muat model sebelum menerima request
+    service.batcher.start()
+    server = await asyncio.start_server(service.serve_client, host, port)
+    print(f"EmoVoice inference service on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.batcher.stop()
+        service.pool.shutdown(cancel_futures=True)
+
+
+def predict_remote(data, url=None, timeout=30):
+    """Client for the service: POST audio bytes, return the ``analyze_clip`` result."""
+    url = (url or os.environ[SERVICE_URL_ENV]).rstrip("/") + "/predict"
+    request = urllib.request.Request(url, data=data, method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        detail = json.loads(e.read() or b"{}").get("error", e.reason)
+        raise RuntimeError(f"Inference service error {e.code}: {detail}") from e
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EmoVoice HTTP inference service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="feature extraction processes")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--max-pending", type=int, default=256, help="in-flight requests before answering 503")
+    parser.add_argument("--read-timeout", type=float, default=READ_TIMEOUT,
+                        help="seconds to receive a whole request before answering 408")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_batch=args.max_batch,
+                          max_wait_ms=args.max_wait_ms, max_pending=args.max_pending,
+                          read_timeout=args.read_timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
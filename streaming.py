@@ -0,0 +1,257 @@
+"""Rolling emotion detection over a live audio stream.
+
+    python streaming.py                      # microphone (sounddevice)
+    python streaming.py --file clip.wav      # file-backed fake input stream
+
+Audio arrives in fixed-size chunks and is resampled with a streaming
+resampler. Only the STFT frames that the new samples complete are
+computed; their log-mel frames are kept in a ring buffer that covers the
+analysis window. Every hop, the MFCC/delta/delta-2 means are derived from
+that ring, so the window is never re-decoded or re-transformed.
+
+With a VAD extractor (a promoted model trained with ``train.py --vad``,
+or EMOVOICE_VAD=1) the resampled samples of the window are kept instead,
+and every hop the window is trimmed with ``vad.trim_silence`` and
+featurized by the extractor, exactly as a clip of that length would be.
+"""
+import argparse
+import queue
+import time
+
+import librosa
+import numpy as np
+import scipy.fft
+import soundfile as sf
+import soxr
+
+from features import default_extractor
+from inference import classify_proba, summarize
+
+SAMPLE_RATE = 44100
+CHUNK_SECONDS = 0.1
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO over rows of a NumPy array; the oldest rows are overwritten."""
+
+    def __init__(self, capacity, row_shape=(), dtype=np.float32):
+        self.data = np.zeros((capacity,) + tuple(row_shape), dtype=dtype)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=self.data.dtype)
+        if len(rows) >= self.capacity:
+            rows = rows[-self.capacity:]
+            self.data[:] = rows
+            self.start, self.size = 0, self.capacity
+            return
+        end = (self.start + self.size) % self.capacity
+        first = min(len(rows), self.capacity - end)
+        self.data[end:end + first] = rows[:first]
+        self.data[:len(rows) - first] = rows[first:]
+        overflow = max(0, self.size + len(rows) - self.capacity)
+        self.start = (self.start + overflow) % self.capacity
+        self.size = min(self.capacity, self.size + len(rows))
+
+    def view(self, n=None):
+        """Copy of the oldest ``n`` rows (all rows by default), oldest first."""
+        n = self.size if n is None else min(n, self.size)
+        idx = (self.start + np.arange(n)) % self.capacity
+        return self.data[idx]
+
+    def drop(self, n):
+        n = min(n, self.size)
+        self.start = (self.start + n) % self.capacity
+        self.size -= n
+
+    def clear(self):
+        self.start = self.size = 0
+
+
+class StreamingDetector:
+    """Emits an emotion/depression classification every ``hop_seconds`` of input.
+
+    Each hop is scored like a one-window clip in the app: distance-weighted
+    probabilities (``classifier``, default ``classify_proba``) combined by
+    ``inference.summarize``.
+    """
+
+    def __init__(self, input_sr=SAMPLE_RATE, window_seconds=3.0, hop_seconds=0.5,
+                 extractor=default_extractor, classifier=classify_proba, top_db=80.0):
+        if "chroma" in extractor.blocks:
+            raise ValueError("Streaming mode only supports the MFCC feature blocks")
+        self.extractor = extractor
+        self.classifier = classifier
+        self.input_sr = input_sr
+        self.sr = extractor.sr
+        self.n_fft = extractor.n_fft
+        self.hop_length = extractor.hop_length
+        self.top_db = top_db
+        self.hop_samples = int(round(hop_seconds * input_sr))
+        self.window_frames = int(np.ceil(window_seconds * self.sr / self.hop_length))
+        # Minimal frame agar delta (lebar 9) bisa dihitung
+        self.min_frames = 9
+
+        self.window = librosa.filters.get_window("hann", self.n_fft, fftbins=True).astype(np.float32)
+        self.mel_basis = librosa.filters.mel(sr=self.sr, n_fft=self.n_fft)
+        self.audio = RingBuffer(self.n_fft + int(CHUNK_SECONDS * self.sr * 4) + self.hop_length)
+        self.frames = RingBuffer(self.window_frames, (self.mel_basis.shape[0],), dtype=np.float64)
+        # Mode VAD: sampel jendela disimpan utuh karena frame sunyi baru bisa
+        # dibuang setelah energi rata-rata seluruh jendela diketahui
+        self.window_audio = RingBuffer(int(round(window_seconds * self.sr))) if extractor.vad else None
+        self.reset()
+
+    def reset(self):
+        self.resampler = None if self.input_sr == self.sr else soxr.ResampleStream(self.input_sr, self.sr, 1)
+        self.audio.clear()
+        self.frames.clear()
+        if self.window_audio is not None:
+            self.window_audio.clear()
+        # Padding setengah n_fft seperti stft(center=True)
+        self.audio.extend(np.zeros(self.n_fft // 2, dtype=np.float32))
+        self.samples_seen = 0
+        self.next_emit = self.hop_samples
+
+    def push(self, chunk):
+        """Feed one chunk of mono samples at ``input_sr``; returns the results emitted by it."""
+        arrived = time.perf_counter()
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        results = []
+        # Potong chunk per hop agar setiap hop menghasilkan satu klasifikasi
+        while len(chunk):
+            take = min(len(chunk), self.next_emit - self.samples_seen)
+            self._ingest(chunk[:take])
+            chunk = chunk[take:]
+            self.samples_seen += take
+            if self.samples_seen >= self.next_emit:
+                self.next_emit += self.hop_samples
+                result = self._classify()
+                if result is not None:
+                    result["latency_ms"] = 1000 * (time.perf_counter() - arrived)
+                    results.append(result)
+        return results
+
+    def _ingest(self, samples):
+        if self.resampler is not None:
+            samples = self.resampler.resample_chunk(samples)
+        if self.window_audio is not None:
+            self.window_audio.extend(samples)
+            return
+        step = self.audio.capacity - self.n_fft
+        for start in range(0, len(samples), step):
+            self.audio.extend(samples[start:start + step])
+            self._compute_frames()
+
+    def _compute_frames(self):
+        available = len(self.audio)
+        if available < self.n_fft:
+            return
+        n_frames = 1 + (available - self.n_fft) // self.hop_length
+        y = self.audio.view(self.n_fft + (n_frames - 1) * self.hop_length)
+        frames = librosa.util.frame(y, frame_length=self.n_fft, hop_length=self.hop_length)
+        power = np.abs(np.fft.rfft(frames * self.window[:, None], axis=0)) ** 2
+        mel = self.mel_basis @ power
+        # Simpan log-mel tanpa pemotongan top_db; pemotongan relatif terhadap
+        # maksimum jendela dilakukan saat klasifikasi, seperti power_to_db
+        self.frames.extend((10.0 * np.log10(np.maximum(1e-10, mel))).T)
+        self.audio.drop(n_frames * self.hop_length)
+
+    def features(self):
+        if self.window_audio is not None:
+            audio = self.window_audio.view()
+            if len(audio) < self.n_fft + (self.min_frames - 1) * self.hop_length:
+                return None
+            return self.extractor.from_audio(audio, self.sr)
+        if len(self.frames) < self.min_frames:
+            return None
+        mel_db = self.frames.view().T
+        mel_db = np.maximum(mel_db, mel_db.max() - self.top_db)
+        mfccs = scipy.fft.dct(mel_db, axis=0, type=2, norm="ortho")[:self.extractor.n_mfcc]
+        blocks = {
+            "mfcc": lambda: np.mean(mfccs.T, axis=0),
+            "mfcc_delta": lambda: np.mean(librosa.feature.delta(mfccs).T, axis=0),
+            "mfcc_delta2": lambda: np.mean(librosa.feature.delta(mfccs, order=2).T, axis=0),
+        }
+        return np.concatenate([blocks[b]() for b in self.extractor.blocks])
+
+    def _classify(self):
+        features = self.features()
+        if features is None:
+            return None
+        labels, proba = self.classifier(features)
+        summary = summarize(labels, proba)
+        return {
+            "t": self.samples_seen / self.input_sr,
+            "emotion": summary["emotion"],
+            "depression": summary["depression"],
+            "depression_score": summary["depression_score"],
+            "confidence": summary["confidence"],
+        }
+
+    def run(self, chunks):
+        """Yield results for every chunk from an iterable of NumPy buffers."""
+        for chunk in chunks:
+            yield from self.push(chunk)
+
+
+def microphone_chunks(samplerate=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS, device=None):
+    import sounddevice as sd
+
+    blocks = queue.Queue()
+
+    def callback(indata, frames, time_info, status):
+        blocks.put(indata[:, 0].copy())
+
+    with sd.InputStream(samplerate=samplerate, channels=1, dtype="float32", device=device,
+                        blocksize=int(samplerate * chunk_seconds), callback=callback):
+        while True:
+            yield blocks.get()
+
+
+class FileInputStream:
+    """Stands in for the microphone: yields fixed-size chunks read from an audio file."""
+
+    def __init__(self, path, chunk_seconds=CHUNK_SECONDS, realtime=False):
+        self.path = path
+        self.chunk_seconds = chunk_seconds
+        self.realtime = realtime
+        self.samplerate = sf.info(path).samplerate
+
+    def __iter__(self):
+        blocksize = int(self.samplerate * self.chunk_seconds)
+        for block in sf.blocks(self.path, blocksize=blocksize, dtype="float32", always_2d=True):
+            if self.realtime:
+                time.sleep(len(block) / self.samplerate)
+            yield block[:, 0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming emotion detection")
+    parser.add_argument("--file", help="read chunks from this file instead of the microphone")
+    parser.add_argument("--realtime", action="store_true", help="pace --file input at real time")
+    parser.add_argument("--window", type=float, default=3.0, help="analysis window in seconds")
+    parser.add_argument("--hop", type=float, default=0.5, help="seconds between classifications")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        source = FileInputStream(args.file, realtime=args.realtime)
+        samplerate = source.samplerate
+    else:
+        samplerate = SAMPLE_RATE
+        source = microphone_chunks(samplerate)
+    detector = StreamingDetector(samplerate, window_seconds=args.window, hop_seconds=args.hop)
+    try:
+        for result in detector.run(source):
+            status = "Depresi" if result["depression"] else "Normal"
+            print(f"{result['t']:7.2f}s  {result['emotion']:<9} {status:<8} {result['depression_score']:4.2f}  {result['latency_ms']:6.1f} ms")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
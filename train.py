@@ -0,0 +1,171 @@
+"""Train the KNN emotion model from the TESS dataset.
+
+    python train.py --data-dir "data/TESS Toronto emotional speech set data" --promote
+
+Writes model/knn_model-<version>.joblib, model/scaler-<version>.joblib and
+model/manifest-<version>.json. With --promote the artifacts are also copied
+to model/knn_model.joblib and model/scaler.joblib, which the app loads,
+and the manifest to model/manifest.json. The app builds its feature
+extractor from the manifest, so a model trained with --vad or
+--res-quality MQ is served with the same settings; restart it after
+promoting.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from audio_io import QUALITIES
+from feature_cache import FeatureCache, file_hash
+from features import FeatureExtractor
+from knn import KNearestNeighbors
+from model_registry import MODEL_PATH, PCA_PATH, SCALER_PATH
+
+DATA_DIR = "data/TESS Toronto emotional speech set data"
+MODEL_DIR = "model"
+
+# Daftar emosi yang akan dikelompokkan (sama dengan notebook)
+emotions_map = {
+    "angry": "angry",
+    "disgust": "disgust",
+    "fear": "fear",
+    "happy": "happy",
+    "neutral": "neutral",
+    "pleasant_surprise": "surprise",
+    "sad": "sad",
+}
+
+
+def discover_dataset(dataset_path):
+    """(path, emotion) pairs for every .wav under the TESS folders, in sorted order."""
+    data = []
+    for root, dirs, files in os.walk(dataset_path):
+        dirs.sort()
+        folder_name = os.path.basename(root)
+        for file in sorted(files):
+            if file.endswith(".wav"):
+                # Mengambil emosi dari nama folder
+                for key in emotions_map.keys():
+                    if key in folder_name.lower():
+                        data.append((os.path.join(root, file), emotions_map[key]))
+                        break
+    return data
+
+
+def dataset_hash(paths, labels, root):
+    digest = hashlib.sha256()
+    for path, label in zip(paths, labels):
+        digest.update(os.path.relpath(path, root).encode())
+        digest.update(label.encode())
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def train(data_dir=DATA_DIR, model_dir=MODEL_DIR, k=5, test_size=0.2, random_state=42,
+          workers=None, extractor=None, cache=None, version=None):
+    start = time.perf_counter()
+    extractor = extractor or FeatureExtractor()
+    data = discover_dataset(data_dir)
+    if not data:
+        raise ValueError(f"No labelled .wav files found under {data_dir}")
+    paths = [p for p, _ in data]
+    y = np.array([label for _, label in data], dtype=object)
+
+    cache = cache or FeatureCache(extractor=extractor)
+    X = cache.extract_many(paths, workers=workers)
+    extract_seconds = time.perf_counter() - start
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=test_size, random_state=random_state
+    )
+    knn = KNearestNeighbors(k=k)
+    knn.fit(X_train, y_train)
+    accuracy = float(accuracy_score(y_test, knn.predict(X_test)))
+
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, f"knn_model-{version}.joblib")
+    scaler_path = os.path.join(model_dir, f"scaler-{version}.joblib")
+    manifest_path = os.path.join(model_dir, f"manifest-{version}.json")
+    joblib.dump(knn, model_path)
+    joblib.dump(scaler, scaler_path)
+
+    manifest = {
+        "version": version,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "model": os.path.basename(model_path),
+        "scaler": os.path.basename(scaler_path),
+        "features": extractor.params(),
+        "n_features": extractor.n_features,
+        "k": k,
+        "labels": sorted(set(y)),
+        "n_samples": len(y),
+        "n_train": len(y_train),
+        "n_test": len(y_test),
+        "test_size": test_size,
+        "random_state": random_state,
+        "dataset_sha256": dataset_hash(paths, y, data_dir),
+        "accuracy": accuracy,
+        "extract_seconds": round(extract_seconds, 3),
+        "total_seconds": round(time.perf_counter() - start, 3),
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def promote(manifest, model_dir=MODEL_DIR):
+    # Salin artefak versi ini ke nama yang dimuat oleh aplikasi
+    shutil.copyfile(os.path.join(model_dir, manifest["model"]), os.path.join(model_dir, os.path.basename(MODEL_PATH)))
+    shutil.copyfile(os.path.join(model_dir, manifest["scaler"]), os.path.join(model_dir, os.path.basename(SCALER_PATH)))
+    # PCA hanya ada untuk model dari tune.py; hapus sisa PCA lama jika model ini tanpa PCA
+    pca_path = os.path.join(model_dir, os.path.basename(PCA_PATH))
+    if manifest.get("pca"):
+        shutil.copyfile(os.path.join(model_dir, manifest["pca"]), pca_path)
+    elif os.path.exists(pca_path):
+        os.remove(pca_path)
+    # manifest.json terakhir dan atomik: aplikasi membaca pengaturan ekstraktor darinya
+    manifest_path = os.path.join(model_dir, "manifest.json")
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the EmoVoice KNN model")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--vad", action="store_true", help="drop silent frames before feature extraction (see vad.py)")
+    parser.add_argument("--res-quality", choices=QUALITIES, default="HQ",
+                        help="soxr resample quality when the clip rate is not 22050 Hz")
+    parser.add_argument("--version", default=None, help="artifact version tag (default: UTC timestamp)")
+    parser.add_argument("--promote", action="store_true", help="also install as model/knn_model.joblib and model/scaler.joblib")
+    args = parser.parse_args(argv)
+
+    # Bukan default_extractor: itu mengikuti manifest model yang sedang dipasang
+    extractor = FeatureExtractor(vad=args.vad, res_quality=args.res_quality)
+    manifest = train(args.data_dir, args.model_dir, k=args.k, test_size=args.test_size,
+                     random_state=args.random_state, workers=args.workers, extractor=extractor,
+                     version=args.version)
+    if args.promote:
+        promote(manifest, args.model_dir)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Cross-validated search over k, distance metric, chroma and PCA.
+
+    python tune.py --folds 5 -j 4 --promote
+
+The full 51-dimensional feature matrix (MFCC, chroma, delta, delta-2) is
+extracted once through the feature cache. Every feature set is a column
+slice of it. For each (feature set, PCA, metric) configuration the data
+is scaled (and reduced with PCA ``n_components="mle"``, as in
+code_model.ipynb) on all rows, like train.py does. One pairwise distance
+matrix is then computed, and every fold and every k only index into it.
+Configurations run in parallel worker processes.
+
+Because the scaler and PCA of that grid pass also see the test folds, its
+scores are transductive and somewhat optimistic. The best ``--recheck``
+candidates are therefore cross-validated again with the scaler and PCA
+fitted on each training fold only, and the best of those wins.
+
+The winner is refitted on all rows and written like train.py output:
+``knn_model-<v>.joblib``, ``scaler-<v>.joblib``, ``pca-<v>.joblib`` (only
+when PCA wins) and ``manifest-<v>.json`` with the CV table. With
+--promote they are installed where the app loads them, and the app takes
+the feature blocks (e.g. chroma) from the promoted manifest on restart.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timezone
+from multiprocessing import Pool
+
+import joblib
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from feature_cache import FeatureCache
+from features import DEFAULT_BLOCKS, FEATURE_BLOCKS, N_CHROMA, FeatureExtractor
+from knn import METRICS, KNearestNeighbors, pairwise_distances
+from train import DATA_DIR, MODEL_DIR, dataset_hash, discover_dataset, promote
+
+FEATURE_SETS = {"mfcc": DEFAULT_BLOCKS, "mfcc+chroma": FEATURE_BLOCKS}
+K_VALUES = (1, 3, 5, 7, 9, 11, 15, 21)
+
+
+def block_columns(extractor, blocks):
+    """Column indices of ``blocks`` (in that order) in ``extractor``'s feature vector."""
+    offsets, start = {}, 0
+    for block in extractor.blocks:
+        width = N_CHROMA if block == "chroma" else extractor.n_mfcc
+        offsets[block] = np.arange(start, start + width)
+        start += width
+    return np.concatenate([offsets[block] for block in blocks])
+
+
+def fit_transform(X, use_pca):
+    scaler = StandardScaler()
+    X = scaler.fit_transform(X)
+    pca = None
+    if use_pca:
+        pca = PCA(n_components="mle")
+        X = pca.fit_transform(X)
+    return X, scaler, pca
+
+
+def vote_accuracies(neighbour_codes, y_true, k_values, n_classes):
+    """Majority-vote accuracy for every k from one sorted neighbour matrix.
+
+    Ties go to the label seen first among the neighbours, exactly like
+    ``knn._vote`` (Counter.most_common).
+    """
+    K = neighbour_codes.shape[1]
+    onehot = neighbour_codes[:, :, None] == np.arange(n_classes)
+    counts = np.cumsum(onehot, axis=1)
+    first = np.where(onehot.any(axis=1), onehot.argmax(axis=1), K)
+    accuracies = {}
+    for k in k_values:
+        c = counts[:, k - 1, :]
+        top = c == c.max(axis=1, keepdims=True)
+        predicted = np.argmin(np.where(top, first, K + 1), axis=1)
+        accuracies[k] = float(np.mean(predicted == y_true))
+    return accuracies
+
+
+# Diisi di setiap worker oleh _init_worker agar matriks fitur tidak dikirim per tugas
+_shared = {}
+
+
+def _init_worker(X, y_codes, folds, columns, k_values):
+    _shared.update(X=X, y=y_codes, folds=folds, columns=columns, k_values=k_values)
+
+
+def per_fold_accuracy(row, X, y_codes, folds, columns):
+    """Mean/std CV accuracy of one grid row with the scaler and PCA fitted on the training fold only."""
+    k, metric = row["k"], row["metric"]
+    X = X[:, columns[row["features"]]]
+    n_classes = int(y_codes.max()) + 1
+    scores = []
+    for train_idx, test_idx in folds:
+        X_train, scaler, pca = fit_transform(X[train_idx], row["pca"])
+        X_test = scaler.transform(X[test_idx])
+        if pca is not None:
+            X_test = pca.transform(X_test)
+        order = np.argsort(pairwise_distances(X_test, X_train, metric), axis=1, kind="stable")[:, :k]
+        scores.append(vote_accuracies(y_codes[train_idx][order], y_codes[test_idx], (k,), n_classes)[k])
+    return float(np.mean(scores)), float(np.std(scores))
+
+
+def recheck(results, data, top=5):
+    """Re-score the ``top`` grid rows with per-fold fitting; returns them best first."""
+    rows = []
+    for row in results[:top]:
+        mean, std = per_fold_accuracy(row, data["X"], data["y_codes"], data["folds"], data["columns"])
+        row["per_fold_accuracy"], row["per_fold_std"] = mean, std
+        rows.append(row)
+    # Sort stabil: urutan grid tetap jadi pemecah seri
+    return sorted(rows, key=lambda row: -row["per_fold_accuracy"])
+
+
+def evaluate_config(config):
+    """Mean/std CV accuracy for every k of one (feature set, pca, metric) configuration."""
+    feature_set, use_pca, metric = config
+    start = time.perf_counter()
+    X, _, pca = fit_transform(_shared["X"][:, _shared["columns"][feature_set]], use_pca)
+    y = _shared["y"]
+    k_values = _shared["k_values"]
+    distances = pairwise_distances(X, X, metric)
+    n_classes = int(y.max()) + 1
+    per_fold = {k: [] for k in k_values}
+    for train_idx, test_idx in _shared["folds"]:
+        sub = distances[np.ix_(test_idx, train_idx)]
+        # Urutan stabil: jarak sama diurutkan menurut indeks latih, seperti knn._nearest
+        order = np.argsort(sub, axis=1, kind="stable")[:, :max(k_values)]
+        for k, accuracy in vote_accuracies(y[train_idx][order], y[test_idx], k_values, n_classes).items():
+            per_fold[k].append(accuracy)
+    return [{
+        "features": feature_set,
+        "pca": use_pca,
+        "n_components": int(pca.n_components_) if pca is not None else int(X.shape[1]),
+        "metric": metric,
+        "k": k,
+        "mean_accuracy": float(np.mean(scores)),
+        "std_accuracy": float(np.std(scores)),
+        "seconds": time.perf_counter() - start,
+    } for k, scores in per_fold.items()]
+
+
+def search(data_dir=DATA_DIR, n_folds=5, k_values=K_VALUES, metrics=METRICS, feature_sets=tuple(FEATURE_SETS),
+           pca_options=(False, True), workers=None, random_state=42, cache=None):
+    """CV results for the whole grid, best first, plus the data they were computed on."""
+    data = discover_dataset(data_dir)
+    if not data:
+        raise ValueError(f"No labelled .wav files found under {data_dir}")
+    paths = [p for p, _ in data]
+    y = np.array([label for _, label in data], dtype=object)
+    extractor = FeatureExtractor(blocks=FEATURE_BLOCKS)
+    cache = cache or FeatureCache(extractor=extractor)
+    X = cache.extract_many(paths, workers=workers)
+
+    labels, y_codes = np.unique(y, return_inverse=True)
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state).split(X, y_codes))
+    columns = {name: block_columns(extractor, FEATURE_SETS[name]) for name in feature_sets}
+    configs = list(itertools.product(feature_sets, pca_options, metrics))
+    init_args = (X, y_codes, folds, columns, tuple(k_values))
+    with Pool(processes=workers, initializer=_init_worker, initargs=init_args) as pool:
+        results = [row for rows in pool.imap(evaluate_config, configs) for row in rows]
+    # Urutan grid (lebih sederhana dulu) menjadi pemecah seri karena sort stabil
+    results.sort(key=lambda row: -row["mean_accuracy"])
+    return results, {"X": X, "y": y, "y_codes": y_codes, "folds": folds, "paths": paths,
+                     "extractor": extractor, "columns": columns}
+
+
+def export(best, data, results, data_dir=DATA_DIR, model_dir=MODEL_DIR, version=None, n_folds=5):
+    """Refit the winning configuration on all rows and write the model, scaler, optional PCA and manifest."""
+    X, scaler, pca = fit_transform(data["X"][:, data["columns"][best["features"]]], best["pca"])
+    knn = KNearestNeighbors(k=best["k"], metric=best["metric"],
+                            algorithm="auto" if best["metric"] == "euclidean" else "brute")
+    knn.fit(X, data["y"])
+
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    os.makedirs(model_dir, exist_ok=True)
+    manifest = {
+        "version": version,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "model": f"knn_model-{version}.joblib",
+        "scaler": f"scaler-{version}.joblib",
+        "pca": f"pca-{version}.joblib" if pca is not None else None,
+        "features": FeatureExtractor(blocks=FEATURE_SETS[best["features"]]).params(),
+        "n_features": int(len(data["columns"][best["features"]])),
+        "n_components": int(X.shape[1]),
+        "k": best["k"],
+        "metric": best["metric"],
+        "labels": sorted(set(data["y"])),
+        "n_samples": len(data["y"]),
+        "cv_folds": n_folds,
+        # Scaler/PCA dilatih hanya pada fold latih (lihat per_fold_accuracy)
+        "cv_accuracy": best.get("per_fold_accuracy", best["mean_accuracy"]),
+        "cv_std": best.get("per_fold_std", best["std_accuracy"]),
+        "cv_accuracy_transductive": best["mean_accuracy"],
+        "cv_results_note": "mean_accuracy/std_accuracy are transductive (scaler and PCA fitted on all rows, "
+                           "test folds included); per_fold_accuracy refits them on each training fold",
+        "dataset_sha256": dataset_hash(data["paths"], data["y"], data_dir),
+        "cv_results": results,
+    }
+    joblib.dump(knn, os.path.join(model_dir, manifest["model"]))
+    joblib.dump(scaler, os.path.join(model_dir, manifest["scaler"]))
+    if pca is not None:
+        joblib.dump(pca, os.path.join(model_dir, manifest["pca"]))
+    with open(os.path.join(model_dir, f"manifest-{version}.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated KNN hyperparameter search")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("-k", type=int, nargs="+", default=list(K_VALUES))
+    parser.add_argument("--metric", nargs="+", choices=METRICS, default=list(METRICS))
+    parser.add_argument("--features", nargs="+", choices=list(FEATURE_SETS), default=list(FEATURE_SETS))
+    parser.add_argument("--pca", choices=["no", "yes", "both"], default="both")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--top", type=int, default=10, help="rows of the CV table to print")
+    parser.add_argument("--recheck", type=int, default=5,
+                        help="best grid rows re-scored with per-fold scaler/PCA fitting before export")
+    parser.add_argument("--version", default=None, help="artifact version tag (default: UTC timestamp)")
+    parser.add_argument("--promote", action="store_true", help="install the winner where the app loads it")
+    args = parser.parse_args(argv)
+
+    pca_options = {"no": (False,), "yes": (True,), "both": (False, True)}[args.pca]
+    start = time.perf_counter()
+    results, data = search(args.data_dir, args.folds, sorted(set(args.k)), args.metric, args.features,
+                           pca_options, args.workers, args.random_state)
+    search_seconds = time.perf_counter() - start
+
+    print(f"{'features':<13}{'pca':<6}{'dims':>5}  {'metric':<10}{'k':>3}{'accuracy':>10}{'std':>8}")
+    for row in results[:args.top]:
+        print(f"{row['features']:<13}{'yes' if row['pca'] else 'no':<6}{row['n_components']:>5}  "
+              f"{row['metric']:<10}{row['k']:>3}{row['mean_accuracy']:>10.4f}{row['std_accuracy']:>8.4f}")
+    print(f"{len(results)} candidates in {search_seconds:.1f} s (transductive: scaler/PCA fitted on all rows)")
+
+    rechecked = recheck(results, data, max(1, args.recheck))
+    print("per-fold scaler/PCA fitting:")
+    for row in rechecked:
+        print(f"{row['features']:<13}{'yes' if row['pca'] else 'no':<6}{row['n_components']:>5}  "
+              f"{row['metric']:<10}{row['k']:>3}{row['per_fold_accuracy']:>10.4f}{row['per_fold_std']:>8.4f}"
+              f"  (grid {row['mean_accuracy']:.4f})")
+
+    manifest = export(rechecked[0], data, results, args.data_dir, args.model_dir, args.version, args.folds)
+    if args.promote:
+        promote(manifest, args.model_dir)
+    print(f"wrote {manifest['model']}, {manifest['scaler']}" + (f", {manifest['pca']}" if manifest["pca"] else ""))
+
+
+if __name__ == "__main__":
+    main()